@@ -0,0 +1,125 @@
+"""
+Benchmarks the request efficiency of the Client against the local stand-in server.
+
+Every scenario reports the number of requests per written pixel (or per call), the wall time,
+the time spent waiting on rate limits and the peak memory traced during the run.
+The traced memory includes the stand-in server, which runs in the same process.
+
+Usage: python -m benchmarks.run [--sizes 8,16,32] [--fills 0,0.5,0.9] [--latency 0.005]
+"""
+import argparse
+import random
+import time
+import tracemalloc
+
+from PIL import Image
+
+import pythonpixels
+from pythonpixels.server import StandInServer
+
+
+def _measure(server, run):
+    # A new token for every run, so no run starts in the cooldown of the previous one
+    _measure.runs += 1
+    client = pythonpixels.Client(f"benchmark-{_measure.runs}", base=server.url, progress=False)
+    server.reset_counts()
+    tracemalloc.start()
+    started = time.perf_counter()
+    run(client)
+    wall = time.perf_counter() - started
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return {
+        "requests": sum(server.counts.values()),
+        "writes": server.counts.get("set_pixel", 0),
+        "wall": wall,
+        "waited": sum(data["waited"] for data in client.metrics.as_dict().values()),
+        "peak": peak
+    }
+
+
+_measure.runs = 0
+
+
+def _picture(size, fill, server, rng):
+    """
+    Makes a random picture and paints a fraction of it onto the canvas already
+    """
+    image = Image.new("RGB", (size, size))
+    image.putdata([(rng.randrange(1, 256), rng.randrange(256), rng.randrange(256)) for _ in range(size * size)])
+    for x in range(size):
+        for y in range(size):
+            i = (y * server.width + x) * 3
+            server.canvas[i:i + 3] = bytes(image.getpixel((x, y))) if rng.random() < fill else b"\x00\x00\x00"
+    return image
+
+
+def bench_set_picture(server, sizes, fills, rng):
+    rows = []
+    for size in sizes:
+        for fill in fills:
+            image = _picture(size, fill, server, rng)
+            result = _measure(server, lambda client: client.set_picture(0, 0, image))
+            per_pixel = result["requests"] / result["writes"] if result["writes"] else float("nan")
+            rows.append((f"set_picture {size}x{size} fill {fill:.0%}", f"{per_pixel:.3f} req/px", result))
+    return rows
+
+
+def _repeat(calls, run):
+    for _ in range(calls):
+        run()
+
+
+def bench_get_canvas(server, calls):
+    rows = []
+    for scale in (1, 4):
+        result = _measure(server, lambda client: _repeat(calls, lambda: client.get_canvas(scale)))
+        rows.append((f"get_canvas scale {scale} x{calls}", f"{result['requests'] / calls:.3f} req/call", result))
+        result = _measure(server, lambda client: _repeat(calls, lambda: client.get_raw_canvas(scale)))
+        rows.append((f"get_raw_canvas scale {scale} x{calls}", f"{result['requests'] / calls:.3f} req/call", result))
+    return rows
+
+
+def bench_get_pixel(server, calls, rng):
+    points = [(rng.randrange(server.width), rng.randrange(server.height)) for _ in range(calls)]
+    result = _measure(server, lambda client: _repeat(1, lambda: [client.get_pixel(x, y) for x, y in points]))
+    return [(f"get_pixel x{calls}", f"{result['requests'] / calls:.3f} req/call", result)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pythonpixels against a local stand-in server")
+    parser.add_argument("--sizes", default="8,16,32", help="Comma separated picture sizes")
+    parser.add_argument("--fills", default="0,0.5,0.9", help="Comma separated fractions of the picture already on the canvas")
+    parser.add_argument("--width", type=int, default=160)
+    parser.add_argument("--height", type=int, default=90)
+    parser.add_argument("--latency", type=float, default=0.0, help="Seconds of latency added to every request")
+    parser.add_argument("--set-limit", type=int, default=200, help="/set_pixel requests per second")
+    parser.add_argument("--get-limit", type=int, default=50, help="/get_pixel requests per second")
+    parser.add_argument("--canvas-limit", type=int, default=10, help="/get_pixels requests per second")
+    parser.add_argument("--calls", type=int, default=20, help="Calls per get_canvas and get_pixel run")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sizes = [int(size) for size in args.sizes.split(",")]
+    fills = [float(fill) for fill in args.fills.split(",")]
+    limits = {
+        "set_pixel": (args.set_limit, 1.0),
+        "get_pixel": (args.get_limit, 1.0),
+        "get_pixels": (args.canvas_limit, 1.0)
+    }
+    rng = random.Random(args.seed)
+
+    with StandInServer(args.width, args.height, limits=limits, latency=args.latency) as server:
+        # Imports happen on first use, so one untimed run keeps them out of the peak memory
+        _measure(server, lambda client: (client.set_picture(0, 0, Image.new("RGB", (1, 1))), client.get_canvas(2), client.get_raw_canvas(2)))
+        rows = bench_set_picture(server, sizes, fills, rng)
+        rows += bench_get_canvas(server, args.calls)
+        rows += bench_get_pixel(server, args.calls, rng)
+
+    print(f"{'scenario':<36} {'efficiency':>16} {'requests':>9} {'wall s':>8} {'waited s':>9} {'peak KiB':>9}")
+    for name, efficiency, result in rows:
+        print(f"{name:<36} {efficiency:>16} {result['requests']:>9} {result['wall']:>8.3f} {result['waited']:>9.3f} {result['peak'] / 1024:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
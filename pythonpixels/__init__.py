@@ -1 +1,6 @@
-from pythonpixels.pythonpixel import *
\ No newline at end of file
+from pythonpixels.limiter import *
+from pythonpixels.metrics import *
+from pythonpixels.pythonpixel import *
+from pythonpixels.asyncclient import *
+from pythonpixels.pool import *
+from pythonpixels.job import *
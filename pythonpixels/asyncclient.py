@@ -0,0 +1,445 @@
+import asyncio
+import datetime
+import io
+import json
+import typing
+
+from pythonpixels.limiter import RateLimiter
+from pythonpixels.metrics import RATE_LIMIT_HEADERS, Metrics
+from pythonpixels.pythonpixel import APIException, OutOfBoundsException, _Guard, _backoff, _check_region, _check_response, _diff_canvas, _diff_picture, _format_color, _raw_canvas
+
+if typing.TYPE_CHECKING:
+    from PIL import Image
+
+
+def _import_aiohttp():
+    """
+    Imports aiohttp on first use, so importing pythonpixels stays fast
+    """
+    try:
+        import aiohttp
+    except ImportError:
+        raise ImportError("aiohttp is required for AsyncClient")
+    return aiohttp
+
+
+class AsyncClient:
+    """
+    An asyncio client that does all the requests and rate limit handling for you.
+    Every endpoint is rate limited on its own, so waiting on one never blocks the others.
+    """
+
+    # How often a rate limited request is sent again, and the first backoff when the API does not say how long to wait
+    RETRIES = 5
+    BACKOFF = 0.5
+
+    def __init__(self, token, size_ttl: float = 60, limiter: typing.Optional[RateLimiter] = None, base: str = "https://pixels.pythondiscord.com"):
+        _import_aiohttp()
+        self.token = token
+        self.headers = {"Authorization": f"Bearer {self.token}"}
+        self.__http = None
+        self.base = base
+        self.limiter = limiter if limiter is not None else RateLimiter()
+
+        self.hooks = []
+        self.metrics = Metrics()
+        self.subscribe(self.metrics)
+
+        self.size_ttl = size_ttl
+        self._size = None
+        self._size_time = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+    @property
+    def _http(self):
+        if self.__http is None or self.__http.closed:
+            self.__http = _import_aiohttp().ClientSession(headers=self.headers)
+        return self.__http
+
+    async def close(self):
+        """
+        Closes the underlying HTTP session
+
+        Params:
+        None
+
+        Returns:
+        None
+        """
+        if self.__http is not None:
+            await self.__http.close()
+            self.__http = None
+
+    async def get_pixel(self, x: int, y: int):
+        """
+        Returns the hexadecimal color code of the given pixel
+
+        Params:
+        x: int - The x position of the pixel
+        y: int - The y position of the pixel
+
+        Returns:
+        int - The color of the requested pixel
+        """
+        size = await self.get_size()
+        if x < 0 or y < 0 or x >= size[0] or y >= size[1]:
+            raise OutOfBoundsException("The selected pixel is out of bounds")
+
+        async with await self._request("get_pixel", "GET", "/get_pixel", params={"x": x, "y": y}) as resp:
+            _check_response(resp.status, "/get_pixel")
+            data = await resp.json()
+            return int(f"0x{data['rgb']}", base=16)
+
+    async def get_canvas(self, scale=1):
+        """
+        Fetch the entire canvas and returns it as a pillow Image instance. Optionally resize it by a scale factor
+
+        Params:
+        scale: int - A factor to resize the image by
+
+        Returns:
+        pillow.Image - The current canvas
+        """
+        from PIL import Image
+
+        if scale <= 0:
+            raise TypeError("Scale must be a positive integer")
+        data, size = await self._get_pixels()
+        im = Image.frombuffer("RGB", size, data, "raw", "RGB", 0, 1)
+        if scale > 1:
+            im = im.resize((im.size[0]*scale, im.size[1]*scale), Image.NEAREST)
+        return im
+
+    async def get_raw_canvas(self, scale: int = 1, path: typing.Optional[str] = None):
+        """
+        Fetch the entire canvas without copying it into an image. Optionally scale it up by a whole factor, or write it to a memory mapped file
+
+        Params:
+        scale: int - A factor to scale the canvas by. Every pixel becomes a block of scale by scale pixels
+        path: str - A file to write the canvas to. The returned canvas is then a view of that file
+
+        Returns:
+        numpy.ndarray/memoryview - A (height, width, 3) array of the canvas when numpy is installed, otherwise a memoryview of the raw RGB bytes
+        """
+        if not isinstance(scale, int) or scale <= 0:
+            raise TypeError("Scale must be a positive integer")
+        data, size = await self._get_pixels()
+        return _raw_canvas(data, size, scale, path)
+
+    async def _get_pixels(self):
+        """
+        Fetches the raw RGB bytes of the entire canvas. Returns the bytes and the size of the canvas
+        """
+        size = await self.get_size()
+        async with await self._request("get_canvas", "GET", "/get_pixels") as resp:
+            data = await resp.read()
+            _check_response(resp.status, "/get_pixels")
+        if len(data) != size[0] * size[1] * 3:
+            # The canvas may have been resized since its size was cached
+            self._size = None
+            size = await self.get_size()
+        if len(data) != size[0] * size[1] * 3:
+            raise APIException(f"/get_pixels returned {len(data)} bytes, expected {size[0] * size[1] * 3} for a {size[0]}x{size[1]} canvas")
+        return data, size
+
+    async def get_size(self):
+        """
+        Returns the size of the canvas
+
+        Params:
+        None
+
+        Returns:
+        tuple - The width and height of the canvas
+        """
+        if self._size is not None and datetime.datetime.now() - self._size_time < datetime.timedelta(seconds=self.size_ttl):
+            return self._size
+        async with await self._request("get_size", "GET", "/get_size", limited=False) as resp:
+            _check_response(resp.status, "/get_size")
+            data = await resp.json()
+            self._size = (data["width"], data["height"])
+            self._size_time = datetime.datetime.now()
+            return self._size
+
+    async def set_pixel(self, x: int, y: int, color: typing.Union[int, str]):
+        """
+        Sets a pixel on the canvas
+
+        Params:
+        x: int - The x position of the pixel
+        y: int - The y position of the pixel
+        color: int/str - the RGB colorcode of the pixel
+
+        Returns:
+        None
+        """
+        color = _format_color(color)
+
+        curcolor = await self.get_pixel(x, y)
+        if int(color, base=16) == curcolor:
+            return
+
+        await self._post_pixel(x, y, color)
+
+    async def _post_pixel(self, x: int, y: int, color: str):
+        """
+        Writes a pixel without checking its current color first. The color must already be formatted. Raises an APIException when the write is rejected
+        """
+        async with await self._request("set_pixel", "POST", "/set_pixel", json={"x": x, "y": y, "rgb": color}) as resp:
+            _check_response(resp.status, "/set_pixel")
+
+    def get_limits(self):
+        """
+        Return the live rate limits tracked by the client's rate limiter. These are refreshed every request.
+        An endpoint that has not been used yet has no known limit, and is returned as tuple(None, now)
+
+        Params:
+        None
+
+        Returns:
+        dict - A dictionary with the rate limits formatted as follow
+            "set_pixel": tuple(remaining, timeout)
+            "get_pixel": tuple(remaining, timeout)
+            "get_canvas": tuple(remaining, timeout)
+        """
+        limits = dict.fromkeys(("set_pixel", "get_pixel", "get_canvas"), (None, datetime.datetime.now()))
+        limits.update(self.limiter.get_limits())
+        return limits
+
+    def subscribe(self, hook: typing.Callable[[dict], None]):
+        """
+        Adds a hook that is called with every event of the client.
+        A "request" event is sent for every HTTP request with the endpoint, method, status, latency, bytes_sent, bytes_received,
+        the rate_limits headers of the response and the seconds it was blocked on the rate limit before it was sent.
+        A "wait" event with the endpoint and the expected delay is sent before the client waits on a rate limit
+
+        Params:
+        hook: callable - A function that takes the event dictionary. It is called from the event loop, so it must not block
+
+        Returns:
+        None
+        """
+        self.hooks.append(hook)
+
+    def unsubscribe(self, hook: typing.Callable[[dict], None]):
+        """
+        Removes a hook added with subscribe
+
+        Params:
+        hook: callable - The hook to remove
+
+        Returns:
+        None
+        """
+        self.hooks.remove(hook)
+
+    def _emit(self, event: dict):
+        for hook in list(self.hooks):
+            hook(event)
+
+    async def _request(self, endpoint: str, method: str, path: str, limited: bool = True, **kwargs):
+        """
+        Sends a rate limited request and tracks the limits it returns. Requests rejected by the rate limit are sent again once the cooldown is over,
+        up to RETRIES times
+        """
+        loop = asyncio.get_running_loop()
+        waited = 0.0
+        for attempt in range(self.RETRIES + 1):
+            if limited:
+                waited += await self._wait(endpoint)
+            started = loop.time()
+            resp = await self._http.request(method, self.base + path, **kwargs)
+            body = await resp.read()
+            latency = loop.time() - started
+            if limited:
+                await self._limit(self.limiter.update, endpoint, resp.headers)
+            self._emit({
+                "event": "request",
+                "endpoint": endpoint,
+                "method": method,
+                "status": resp.status,
+                "latency": latency,
+                "bytes_sent": len(json.dumps(kwargs["json"])) if "json" in kwargs else 0,
+                "bytes_received": len(body),
+                "rate_limits": {key: resp.headers[key] for key in RATE_LIMIT_HEADERS if key in resp.headers},
+                "waited": waited
+            })
+            if resp.status != 429:
+                return resp
+            resp.release()
+
+            waited = 0.0
+            delay = _backoff(resp.headers, self.BACKOFF * 2 ** attempt, limited)
+            if delay > 0 and attempt < self.RETRIES:
+                started = loop.time()
+                self._emit({"event": "wait", "endpoint": endpoint, "delay": delay})
+                await asyncio.sleep(delay)
+                waited = loop.time() - started
+        raise APIException(f"{path} is still rate limited after {self.RETRIES} retries")
+
+    async def _limit(self, method: typing.Callable, *args):
+        """
+        Calls a method of the rate limiter. A limiter shared through a file waits on a file lock, so it is called from a thread to keep the event loop running
+        """
+        if self.limiter.path is None:
+            return method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    async def _wait(self, endpoint: str):
+        """
+        Reserves a request on an endpoint and waits until it may be sent. Returns the seconds actually blocked.
+        When the wait is cancelled the reserved request is given back
+        """
+        delay = await self._limit(self.limiter.reserve, endpoint)
+        if delay <= 0:
+            return 0
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        self._emit({"event": "wait", "endpoint": endpoint, "delay": delay})
+        try:
+            await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            await self._limit(self.limiter.release, endpoint)
+            raise
+        return loop.time() - started
+
+    async def plan_picture(self, ox: int, oy: int, img: typing.Union[str, "Image.Image"]):
+        """
+        Compares a picture with offset x and y against the canvas and returns the pixels that need to be written.
+        The canvas is fetched once and fully transparent pixels are skipped.
+
+        Params:
+        ox: int - The x offset
+        oy: int- The y offset
+        img: typing.Union[str, pillow.Image.Image] - The image to compare. Can either be a path, a HTTP direct image link or a pillow image instance
+
+        Returns:
+        list - A list of (x, y, color) tuples for every pixel that differs from the canvas
+        """
+        image = await self._load_image(img)
+
+        size = await self.get_size()
+        if ox + image.width > size[0] or oy + image.height > size[1] or ox < 0 or oy < 0:
+            raise OutOfBoundsException("The image is out of bounds")
+
+        canvas, size = await self._get_pixels()
+        return _diff_picture(image, canvas, size, ox, oy)
+
+    async def execute_plan(self, plan: typing.Iterable[typing.Tuple[int, int, typing.Union[int, str]]]):
+        """
+        Writes every pixel of a plan made by plan_picture without reading the canvas again
+
+        Params:
+        plan: iterable - The (x, y, color) tuples to write
+
+        Returns:
+        None
+        """
+        for x, y, color in plan:
+            await self._post_pixel(x, y, _format_color(color))
+
+    async def set_picture(self, ox: int, oy: int, img: typing.Union[str, "Image.Image"]):
+        """
+        Starts a job to add a picture with offset x an y. Img can either be a file directory, an direct URL (Only HTTP supported) or a pillow.Image
+        Only the pixels that differ from the canvas are written
+
+        Params:
+        ox: int - The x offset
+        oy: int- The y offset
+        img: typing.Union[str, pillow.Image.Image] - The image to upload. Can either be a path, a HTTP direct image link or a pillow image instance
+
+        Returns:
+        None
+        """
+        await self.execute_plan(await self.plan_picture(ox, oy, img))
+
+    async def watch(self, region: typing.Optional[typing.Tuple[int, int, int, int]] = None, interval: float = 0):
+        """
+        Polls the canvas within the rate limit and yields the pixels that changed since the previous poll.
+        The first poll only takes a snapshot. Nothing is yielded when a poll has no changes
+
+        Params:
+        region: tuple - An optional (x, y, width, height) area to watch. The whole canvas is watched by default. It must lie within the canvas
+        interval: float - The minimum number of seconds between polls
+
+        Returns:
+        async generator - Yields lists of (x, y, old color, new color) tuples
+        """
+        loop = asyncio.get_running_loop()
+        previous = None
+        while True:
+            started = loop.time()
+            canvas, size = await self._get_pixels()
+            _check_region(region, size)
+            if previous is not None and len(previous) == len(canvas):
+                changes = _diff_canvas(previous, canvas, size, region)
+                if changes:
+                    yield changes
+            previous = canvas
+            await asyncio.sleep(max(0, interval - (loop.time() - started)))
+
+    async def guard(self, ox: int, oy: int, img: typing.Union[str, "Image.Image"], batch_size: int = 10, interval: float = 0):
+        """
+        Keeps a picture with offset x and y on the canvas. Pixels that differ from the picture are repaired, the ones that differ the most first.
+        After the first poll only the pixels that changed are checked again
+
+        Params:
+        ox: int - The x offset
+        oy: int - The y offset
+        img: typing.Union[str, pillow.Image.Image] - The image to guard. Can either be a path, a HTTP direct image link or a pillow image instance
+        batch_size: int - The maximum number of pixels to repair between polls
+        interval: float - The minimum number of seconds between polls
+
+        Returns:
+        async generator - Yields a list of the (x, y, color) tuples repaired after every poll
+        """
+        image = await self._load_image(img)
+        size = await self.get_size()
+        if ox + image.width > size[0] or oy + image.height > size[1] or ox < 0 or oy < 0:
+            raise OutOfBoundsException("The image is out of bounds")
+
+        loop = asyncio.get_running_loop()
+        guard = _Guard(image, ox, oy, size)
+        previous = None
+        while True:
+            started = loop.time()
+            canvas, size = await self._get_pixels()
+            if previous is None or size != guard.size:
+                guard.reset(canvas, size)
+            else:
+                guard.update(_diff_canvas(previous, canvas, guard.size, guard.region), canvas)
+            previous = canvas
+
+            repairs = guard.take(batch_size)
+            for x, y, color in repairs:
+                await self._post_pixel(x, y, color)
+            yield repairs
+            await asyncio.sleep(max(0, interval - (loop.time() - started)))
+
+    async def _load_image(self, img: typing.Union[str, "Image.Image"]):
+        """
+        Opens an image from a path or HTTP link. Pillow images are returned as is
+        """
+        from PIL import Image
+
+        if isinstance(img, str):
+            if img.startswith(("http://", "https://")):
+                async with _import_aiohttp().ClientSession() as session:
+                    async with session.get(img) as r:
+                        if r.status != 200:
+                            raise TypeError("The given image could not be found")
+                        image = Image.open(io.BytesIO(await r.read()))
+            else:
+                try:
+                    image = Image.open(img)
+                except OSError:
+                    raise TypeError("The given image could not be found")
+
+        else:
+            image = img
+        return image
@@ -0,0 +1,246 @@
+import array
+import base64
+import json
+import os
+import sys
+import typing
+
+from pythonpixels.pythonpixel import Client, OutOfBoundsException, _diff_picture
+
+if typing.TYPE_CHECKING:
+    from PIL import Image
+
+
+def order_columns(plan, image, ox, oy, canvas, size):
+    """
+    Writes the picture column by column
+    """
+    return sorted(plan, key=lambda p: (p[0], p[1]))
+
+
+def order_rows(plan, image, ox, oy, canvas, size):
+    """
+    Writes the picture row by row
+    """
+    return sorted(plan, key=lambda p: (p[1], p[0]))
+
+
+def order_outline(plan, image, ox, oy, canvas, size):
+    """
+    Writes the edges of the shapes in the picture first, then fills them in
+    """
+    width, height = image.size
+    data = image.tobytes()
+
+    def pixel(x, y):
+        if x < 0 or y < 0 or x >= width or y >= height:
+            return None
+        i = (y * width + x) * 4
+        return data[i:i + 4] if data[i + 3] else None
+
+    def is_edge(p):
+        x, y = p[0] - ox, p[1] - oy
+        own = pixel(x, y)
+        return any(pixel(x + dx, y + dy) != own for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)))
+
+    return sorted(plan, key=lambda p: not is_edge(p))
+
+
+def order_center(plan, image, ox, oy, canvas, size):
+    """
+    Writes the picture from its center outwards
+    """
+    cx = ox + (image.width - 1) / 2
+    cy = oy + (image.height - 1) / 2
+    return sorted(plan, key=lambda p: (p[0] - cx) ** 2 + (p[1] - cy) ** 2)
+
+
+def order_visible(plan, image, ox, oy, canvas, size):
+    """
+    Writes the pixels that differ the most from the canvas first
+    """
+    def distance(p):
+        i = (p[1] * size[0] + p[0]) * 3
+        return sum((a - b) ** 2 for a, b in zip(p[2].to_bytes(3, "big"), canvas[i:i + 3]))
+
+    return sorted(plan, key=distance, reverse=True)
+
+
+ORDERINGS = {
+    "columns": order_columns,
+    "rows": order_rows,
+    "outline": order_outline,
+    "center": order_center,
+    "visible": order_visible
+}
+
+
+class PictureJob:
+    """
+    A resumable job that uploads a picture. The pixels still to write are kept in compact arrays,
+    and with a path the job is checkpointed to disk after every batch so it can be resumed after a crash.
+    Create a job with PictureJob.create and continue one with PictureJob.resume.
+    """
+
+    def __init__(self, client: Client, xs: array.array, ys: array.array, colors: array.array, cursor: int = 0, path: typing.Optional[str] = None):
+        self.client = client
+        self.xs = xs
+        self.ys = ys
+        self.colors = colors
+        self.cursor = cursor
+        self.path = path
+        self._saved = None
+
+    @classmethod
+    def create(cls, client: Client, ox: int, oy: int, img: typing.Union[str, "Image.Image"], order: typing.Union[str, typing.Callable] = "columns", path: typing.Optional[str] = None):
+        """
+        Plans a picture with offset x and y against the canvas and returns a job that writes the pixels that differ
+
+        Params:
+        client: Client - The client to write with
+        ox: int - The x offset
+        oy: int - The y offset
+        img: typing.Union[str, pillow.Image.Image] - The image to upload. Can either be a path, a HTTP direct image link or a pillow image instance
+        order: str/callable - The order to write the pixels in. Either one of "columns", "rows", "outline", "center" and "visible",
+            or a callable taking (plan, image, ox, oy, canvas, size) that returns the reordered plan
+        path: str - The file to checkpoint the job to
+
+        Returns:
+        PictureJob - The planned job
+        """
+        if isinstance(order, str):
+            try:
+                order = ORDERINGS[order]
+            except KeyError:
+                raise TypeError(f"Unknown order '{order}'")
+
+        image = client._load_image(img).convert("RGBA")
+        size = client.get_size()
+        if ox + image.width > size[0] or oy + image.height > size[1] or ox < 0 or oy < 0:
+            raise OutOfBoundsException("The image is out of bounds")
+
+        canvas, size = client._get_pixels()
+        plan = [(x, y, int(color, base=16)) for x, y, color in _diff_picture(image, canvas, size, ox, oy)]
+        plan = order(plan, image, ox, oy, canvas, size)
+
+        job = cls(
+            client,
+            array.array("H", (p[0] for p in plan)),
+            array.array("H", (p[1] for p in plan)),
+            array.array("I", (p[2] for p in plan)),
+            path=path
+        )
+        job.save()
+        return job
+
+    @classmethod
+    def resume(cls, client: Client, path: str):
+        """
+        Loads a checkpointed job. Its pixels are checked against one fresh copy of the canvas:
+        written pixels that were changed since are written again first, and remaining pixels that already match are dropped
+
+        Params:
+        client: Client - The client to write with
+        path: str - The checkpoint file of the job
+
+        Returns:
+        PictureJob - The resumed job
+        """
+        with open(path) as file:
+            state = json.load(file)
+
+        arrays = []
+        for key, typecode in (("xs", "H"), ("ys", "H"), ("colors", "I")):
+            values = array.array(typecode)
+            values.frombytes(base64.b64decode(state[key]))
+            if sys.byteorder == "big":
+                values.byteswap()
+            arrays.append(values)
+
+        job = cls(client, *arrays, cursor=state["cursor"], path=path)
+        job.recheck()
+        return job
+
+    @property
+    def total(self):
+        return len(self.colors)
+
+    @property
+    def remaining(self):
+        return len(self.colors) - self.cursor
+
+    def recheck(self):
+        """
+        Compares every pixel of the job with the canvas using one request, and queues the ones that do not match yet.
+        Pixels that were already written are queued first
+
+        Params:
+        None
+
+        Returns:
+        None
+        """
+        canvas, size = self.client._get_pixels()
+
+        # Written pixels sit before the cursor, so keeping the job's order queues them first
+        keep = []
+        for i in range(len(self.colors)):
+            c = (self.ys[i] * size[0] + self.xs[i]) * 3
+            if int.from_bytes(canvas[c:c + 3], "big") != self.colors[i]:
+                keep.append(i)
+
+        self.xs = array.array("H", (self.xs[i] for i in keep))
+        self.ys = array.array("H", (self.ys[i] for i in keep))
+        self.colors = array.array("I", (self.colors[i] for i in keep))
+        self.cursor = 0
+        self.save()
+
+    def save(self):
+        """
+        Writes a checkpoint of the job, if it has a path
+
+        Params:
+        None
+
+        Returns:
+        None
+        """
+        if self.path is None or self._saved == (self.cursor, len(self.colors)):
+            return
+
+        state = {"cursor": self.cursor}
+        for key, values in (("xs", self.xs), ("ys", self.ys), ("colors", self.colors)):
+            if sys.byteorder == "big":
+                values = array.array(values.typecode, values)
+                values.byteswap()
+            state[key] = base64.b64encode(values.tobytes()).decode()
+
+        tmp = self.path + ".tmp"
+        with open(tmp, "w") as file:
+            json.dump(state, file)
+        os.replace(tmp, self.path)
+        self._saved = (self.cursor, len(self.colors))
+
+    def run(self, batch_size: int = 100):
+        """
+        Writes the remaining pixels, checkpointing after every batch. The job is also checkpointed when it is interrupted.
+        A pixel only counts as written once the API accepts it, so a rejected write stops the job at that pixel and raises an APIException
+
+        Params:
+        batch_size: int - The number of pixels to write between checkpoints
+
+        Returns:
+        None
+        """
+        if batch_size <= 0:
+            raise TypeError("Batch size must be a positive integer")
+        try:
+            while self.cursor < len(self.colors):
+                end = min(self.cursor + batch_size, len(self.colors))
+                while self.cursor < end:
+                    i = self.cursor
+                    self.client._post_pixel(self.xs[i], self.ys[i], f"{self.colors[i]:06X}")
+                    self.cursor += 1
+                self.save()
+        finally:
+            self.save()
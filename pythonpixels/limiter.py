@@ -0,0 +1,138 @@
+import contextlib
+import datetime
+import json
+import threading
+import time
+import typing
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+
+class RateLimiter:
+    """
+    Tracks the rate limit of every endpoint from the headers the API sends back.
+    Every request reserves a slot before it is sent, so the limiter knows when the next request may go out instead of waiting to be rejected.
+    One limiter can be shared by any number of clients and threads. Pass a path to also share it between processes using the same token.
+    """
+
+    def __init__(self, path: typing.Optional[str] = None):
+        if path is not None and fcntl is None:
+            raise TypeError("Sharing a rate limiter through a file is not supported on this platform")
+        self.path = path
+        self._lock = threading.Lock()
+        self._buckets = {}
+
+    @contextlib.contextmanager
+    def _state(self):
+        """
+        Locks the limiter and yields its buckets. With a state file the buckets are loaded and saved under an exclusive file lock
+        """
+        with self._lock:
+            if self.path is None:
+                yield self._buckets
+                return
+
+            with open(self.path, "a+") as file:
+                fcntl.flock(file, fcntl.LOCK_EX)
+                try:
+                    file.seek(0)
+                    try:
+                        self._buckets = json.loads(file.read() or "{}")
+                    except ValueError:
+                        self._buckets = {}
+                    yield self._buckets
+                    file.seek(0)
+                    file.truncate()
+                    file.write(json.dumps(self._buckets))
+                    file.flush()
+                finally:
+                    fcntl.flock(file, fcntl.LOCK_UN)
+
+    def reserve(self, endpoint: str):
+        """
+        Reserves a request on an endpoint and returns how long to wait before sending it
+
+        Params:
+        endpoint: str - The name of the endpoint
+
+        Returns:
+        float - The number of seconds to wait
+        """
+        now = time.time()
+        with self._state() as buckets:
+            bucket = buckets.get(endpoint)
+            if bucket is None or bucket["remaining"] is None:
+                return 0
+            if bucket["remaining"] <= 0:
+                bucket["available"] = max(bucket["reset"], now)
+                bucket["remaining"] = bucket["limit"] or 1
+                bucket["reset"] = bucket["available"] + bucket["period"]
+            bucket["remaining"] -= 1
+            return max(0, bucket["available"] - now)
+
+    def release(self, endpoint: str):
+        """
+        Gives back a request reserved with reserve that was not sent
+
+        Params:
+        endpoint: str - The name of the endpoint
+
+        Returns:
+        None
+        """
+        with self._state() as buckets:
+            bucket = buckets.get(endpoint)
+            if bucket is not None and bucket["remaining"] is not None and bucket["remaining"] < (bucket["limit"] or 1):
+                bucket["remaining"] += 1
+
+    def update(self, endpoint: str, headers: typing.Mapping[str, str]):
+        """
+        Updates an endpoint from the rate limit headers of a response
+
+        Params:
+        endpoint: str - The name of the endpoint
+        headers: Mapping - The response headers
+
+        Returns:
+        None
+        """
+        now = time.time()
+        with self._state() as buckets:
+            bucket = buckets.setdefault(endpoint, {"remaining": None, "limit": None, "reset": now, "period": 0, "available": now})
+            try:
+                remaining = int(headers["requests-remaining"])
+                reset = now + float(headers["requests-reset"])
+            except KeyError:
+                if "cooldown-reset" in headers:
+                    bucket["remaining"] = 0
+                    bucket["reset"] = now + float(headers["cooldown-reset"])
+                return
+
+            if "requests-limit" in headers:
+                bucket["limit"] = int(headers["requests-limit"])
+            bucket["period"] = float(headers.get("requests-period", headers["requests-reset"]))
+            # Requests reserved by other workers may still be in flight, so only trust a higher count from a new window
+            if bucket["remaining"] is None or reset > bucket["reset"] + 1:
+                bucket["remaining"] = remaining
+            else:
+                bucket["remaining"] = min(bucket["remaining"], remaining)
+            bucket["reset"] = reset
+
+    def get_limits(self):
+        """
+        Returns the live rate limit state of every endpoint that has been seen
+
+        Params:
+        None
+
+        Returns:
+        dict - A dictionary with a tuple(remaining, timeout) for every endpoint
+        """
+        with self._state() as buckets:
+            return {
+                endpoint: (bucket["remaining"], datetime.datetime.fromtimestamp(bucket["reset"]))
+                for endpoint, bucket in buckets.items()
+            }
@@ -0,0 +1,176 @@
+import json
+import math
+import threading
+import time
+import typing
+
+RATE_LIMIT_HEADERS = ("requests-remaining", "requests-limit", "requests-period", "requests-reset", "cooldown-reset")
+
+
+class Metrics:
+    """
+    Counts the requests a client sends. Subscribe it to a client to collect its events.
+    Requests, bytes, rate limit waits and a latency histogram are kept per endpoint, and can be exported as Prometheus text or JSON.
+    Every client keeps one in its metrics attribute.
+    """
+
+    BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._endpoints = {}
+
+    def _endpoint(self, endpoint: str):
+        return self._endpoints.setdefault(endpoint, {
+            "requests": {},
+            "bytes_sent": 0,
+            "bytes_received": 0,
+            "waits": 0,
+            "waited": 0.0,
+            "latency_buckets": [0] * (len(self.BUCKETS) + 1),
+            "latency_sum": 0.0,
+            "latency_count": 0
+        })
+
+    def __call__(self, event: typing.Dict[str, typing.Any]):
+        with self._lock:
+            data = self._endpoint(event["endpoint"])
+            if event["event"] == "wait":
+                data["waits"] += 1
+                return
+            if event["event"] != "request":
+                return
+
+            status = str(event["status"])
+            data["requests"][status] = data["requests"].get(status, 0) + 1
+            data["bytes_sent"] += event["bytes_sent"]
+            data["bytes_received"] += event["bytes_received"]
+            # The time actually blocked, which can differ from the delay the wait event expected
+            data["waited"] += event["waited"]
+            for i, bound in enumerate(self.BUCKETS):
+                if event["latency"] <= bound:
+                    data["latency_buckets"][i] += 1
+                    break
+            else:
+                data["latency_buckets"][-1] += 1
+            data["latency_sum"] += event["latency"]
+            data["latency_count"] += 1
+
+    def as_dict(self):
+        """
+        Returns a copy of the collected metrics
+
+        Params:
+        None
+
+        Returns:
+        dict - The metrics of every endpoint. The latency buckets are not cumulative, the last one counts everything above the largest bound
+        """
+        with self._lock:
+            return json.loads(json.dumps(self._endpoints))
+
+    def to_json(self):
+        """
+        Returns the collected metrics as JSON
+
+        Params:
+        None
+
+        Returns:
+        str - The metrics, with the latency bucket bounds under "buckets"
+        """
+        return json.dumps({"buckets": list(self.BUCKETS), "endpoints": self.as_dict()})
+
+    def to_prometheus(self, prefix: str = "pythonpixels"):
+        """
+        Returns the collected metrics in the Prometheus text format
+
+        Params:
+        prefix: str - The prefix of every metric name
+
+        Returns:
+        str - The metrics
+        """
+        endpoints = self.as_dict()
+        lines = []
+
+        def metric(name, kind, help, samples):
+            lines.append(f"# HELP {prefix}_{name} {help}")
+            lines.append(f"# TYPE {prefix}_{name} {kind}")
+            for suffix, labels, value in samples:
+                label = ",".join(f'{key}="{val}"' for key, val in labels.items())
+                lines.append(f"{prefix}_{name}{suffix}{{{label}}} {value}")
+
+        metric("requests_total", "counter", "HTTP requests sent, by endpoint and status", [
+            ("", {"endpoint": endpoint, "status": status}, count)
+            for endpoint, data in endpoints.items() for status, count in data["requests"].items()
+        ])
+        metric("sent_bytes_total", "counter", "Bytes sent in request bodies", [
+            ("", {"endpoint": endpoint}, data["bytes_sent"]) for endpoint, data in endpoints.items()
+        ])
+        metric("received_bytes_total", "counter", "Bytes received in response bodies", [
+            ("", {"endpoint": endpoint}, data["bytes_received"]) for endpoint, data in endpoints.items()
+        ])
+        metric("rate_limit_waits_total", "counter", "Times a request waited on a rate limit", [
+            ("", {"endpoint": endpoint}, data["waits"]) for endpoint, data in endpoints.items()
+        ])
+        metric("rate_limit_wait_seconds_total", "counter", "Seconds spent waiting on rate limits", [
+            ("", {"endpoint": endpoint}, data["waited"]) for endpoint, data in endpoints.items()
+        ])
+
+        samples = []
+        for endpoint, data in endpoints.items():
+            total = 0
+            for bound, count in zip(self.BUCKETS + (math.inf,), data["latency_buckets"]):
+                total += count
+                samples.append(("_bucket", {"endpoint": endpoint, "le": "+Inf" if bound == math.inf else str(bound)}, total))
+            samples.append(("_sum", {"endpoint": endpoint}, data["latency_sum"]))
+            samples.append(("_count", {"endpoint": endpoint}, data["latency_count"]))
+        metric("request_duration_seconds", "histogram", "Request latency in seconds", samples)
+        return "\n".join(lines) + "\n"
+
+
+class RichProgress:
+    """
+    Shows a rich progress bar while a client waits on a rate limit. The bar runs in a thread of its own, so the hook returns right away
+    and the next hook sees the wait as it starts. The bar ends at the deadline, or at the next request
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+        self._stopped = None
+
+    def __call__(self, event: typing.Dict[str, typing.Any]):
+        if event["event"] == "wait":
+            self._start(event["endpoint"], event["delay"])
+        elif event["event"] == "request":
+            self._stop()
+
+    def _start(self, endpoint: str, delay: float):
+        self._stop()
+        with self._lock:
+            self._stopped = threading.Event()
+            self._thread = threading.Thread(target=self._show, args=(endpoint, delay, self._stopped), daemon=True)
+            self._thread.start()
+
+    def _stop(self):
+        with self._lock:
+            thread, self._thread = self._thread, None
+            if thread is not None:
+                self._stopped.set()
+        if thread is not None:
+            thread.join()
+
+    def _show(self, endpoint: str, delay: float, stopped: threading.Event):
+        from rich.progress import Progress
+
+        started = time.monotonic()
+        with Progress() as progress:
+            task = progress.add_task(f"[cyan bold]Awaiting /{endpoint} rate limit..", total=delay)
+            while not stopped.wait(max(0, min(0.1, started + delay - time.monotonic()))):
+                elapsed = time.monotonic() - started
+                progress.update(task, completed=min(elapsed, delay))
+                if elapsed >= delay:
+                    break
+            progress.update(task, completed=delay)
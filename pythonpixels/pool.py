@@ -0,0 +1,196 @@
+import collections
+import threading
+import time
+import typing
+
+from pythonpixels.pythonpixel import Client, _format_color
+
+
+class _Lane:
+    """
+    A single token's worker thread and its counters
+    """
+
+    def __init__(self, client: Client):
+        self.client = client
+        self.thread = None
+        self.writes = 0
+        self.waited = 0.0
+        self.busy = 0.0
+
+
+class ClientPool:
+    """
+    Shares pixel writes between several tokens. Every token gets its own client and rate limit,
+    and every write goes to whichever token is free first. When a pixel is written more than once before it is sent, only the latest color is sent.
+    A pixel is never sent by two tokens at once, so a later write cannot overtake an earlier one.
+    """
+
+    def __init__(self, tokens: typing.Iterable[str], **kwargs):
+        # Several workers cannot share one terminal progress bar
+        kwargs.setdefault("progress", False)
+        self._lanes = [_Lane(Client(token, **kwargs)) for token in tokens]
+        if not self._lanes:
+            raise TypeError("At least one token is required")
+
+        self._pending = {}
+        self._queue = collections.deque()
+        self._sending = set()
+        self._in_flight = 0
+        self._closed = False
+        self._error = None
+        self._cond = threading.Condition()
+
+    @property
+    def clients(self):
+        return [lane.client for lane in self._lanes]
+
+    def _start(self):
+        """
+        Starts the workers that are not running yet. Must be called with the lock held
+        """
+        for lane in self._lanes:
+            if lane.thread is None:
+                lane.thread = threading.Thread(target=self._run, args=(lane,), daemon=True)
+                lane.thread.start()
+
+    def submit(self, x: int, y: int, color: typing.Union[int, str]):
+        """
+        Queues a pixel to be written. This does not wait for the write
+
+        Params:
+        x: int - The x position of the pixel
+        y: int - The y position of the pixel
+        color: int/str - the RGB colorcode of the pixel
+
+        Returns:
+        None
+        """
+        color = _format_color(color)
+        with self._cond:
+            if self._closed:
+                raise TypeError("The pool is closed")
+            if (x, y) not in self._pending:
+                self._queue.append((x, y))
+            self._pending[(x, y)] = color
+            self._cond.notify()
+            self._start()
+
+    def write(self, writes: typing.Iterable[typing.Tuple[int, int, typing.Union[int, str]]]):
+        """
+        Writes every pixel of a stream of (x, y, color) tuples, such as a plan made by plan_picture, and waits until they are all sent
+
+        Params:
+        writes: iterable - The (x, y, color) tuples to write
+
+        Returns:
+        None
+        """
+        for x, y, color in writes:
+            self.submit(x, y, color)
+        self.join()
+
+    def join(self):
+        """
+        Waits until every queued pixel is written. Raises the first error a worker ran into
+
+        Params:
+        None
+
+        Returns:
+        None
+        """
+        with self._cond:
+            while (self._queue or self._in_flight) and self._error is None:
+                self._cond.wait()
+            if self._error is not None:
+                error, self._error = self._error, None
+                raise error
+
+    def close(self):
+        """
+        Stops the workers once the queue is empty
+
+        Params:
+        None
+
+        Returns:
+        None
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        for lane in self._lanes:
+            if lane.thread is not None:
+                lane.thread.join()
+
+    def stats(self):
+        """
+        Returns the throughput of every token
+
+        Params:
+        None
+
+        Returns:
+        list - A dictionary per token with the number of accepted writes, the seconds spent waiting on the rate limit
+            and the writes per second while the token was busy writing
+        """
+        return [{
+            "writes": lane.writes,
+            "waited": lane.waited,
+            "throughput": lane.writes / lane.busy if lane.busy > 0 else 0.0
+        } for lane in self._lanes]
+
+    def _ready(self):
+        """
+        Moves the first queued pixel that is not being sent to the front of the queue. Returns whether there is one. Must be called with the lock held
+        """
+        for _ in range(len(self._queue)):
+            if self._queue[0] not in self._sending:
+                return True
+            self._queue.rotate(-1)
+        return False
+
+    def _take(self):
+        """
+        Takes a queued pixel without waiting. Returns None when no pixel can be sent
+        """
+        with self._cond:
+            if not self._ready():
+                return None
+            x, y = self._queue.popleft()
+            self._sending.add((x, y))
+            self._in_flight += 1
+            return x, y, self._pending.pop((x, y))
+
+    def _run(self, lane: _Lane):
+        while True:
+            with self._cond:
+                while not self._ready():
+                    if self._closed and not self._queue:
+                        return
+                    self._cond.wait()
+
+            # Only take a pixel once this token may send, so the others can pick it up in the meantime
+            started = time.monotonic()
+            waited = lane.client._wait("set_pixel")
+            lane.waited += waited
+
+            write = self._take()
+            if write is None:
+                # The other tokens emptied the queue while this one waited
+                lane.client.limiter.release("set_pixel")
+                continue
+            try:
+                lane.client._post_pixel(*write, reserved=waited)
+                lane.writes += 1
+            except Exception as error:
+                with self._cond:
+                    if self._error is None:
+                        self._error = error
+            finally:
+                lane.busy += time.monotonic() - started
+                with self._cond:
+                    self._sending.discard(write[:2])
+                    self._in_flight -= 1
+                    self._cond.notify_all()
@@ -1,9 +1,15 @@
 import requests
 import time
-from PIL import Image
 import typing
-from rich.progress import track
 import datetime
+import heapq
+import mmap
+
+from pythonpixels.limiter import RateLimiter
+from pythonpixels.metrics import RATE_LIMIT_HEADERS, Metrics, RichProgress
+
+if typing.TYPE_CHECKING:
+    from PIL import Image
 
 class OutOfBoundsException(Exception):
     """
@@ -11,89 +17,74 @@ class OutOfBoundsException(Exception):
     """
     pass
 
+class APIException(Exception):
+    """
+    An exception class to use whenever the API returns an error or an invalid response
+    """
+    pass
+
 class Client:
     """
     A client that does all the requests and rate limit handling for you.
+    Every HTTP request is sent as an event to the subscribed hooks. With progress, a progress bar is shown while waiting on a rate limit.
     """
 
-    def __init__(self, token):
+    # How often a rate limited request is sent again, and the first backoff when the API does not say how long to wait
+    RETRIES = 5
+    BACKOFF = 0.5
+
+    def __init__(self, token, mirror: bool = False, size_ttl: float = 60, limiter: typing.Optional[RateLimiter] = None, base: str = "https://pixels.pythondiscord.com", progress: bool = True):
         self.token = token
         self.headers = {"Authorization": f"Bearer {self.token}"}
         self.__http = requests.Session()
-        self.base = "https://pixels.pythondiscord.com"
-
-        with self.__http.head(self.base + "/set_pixel", headers=self.headers) as resp:
-            headers = resp.headers
-            try:
-                self.post_limit = headers["requests-remaining"]
-            except KeyError:
-                self.post_limit = 0
-            if self.post_limit < headers["requests-limit"]:
-                self.post_timeout = datetime.datetime.now() + datetime.timedelta(seconds=float(headers['requests-reset']))
-            else:
-                self.post_timeout = datetime.datetime.now()
+        self.base = base
+        self.limiter = limiter if limiter is not None else RateLimiter()
 
-        
-        with self.__http.head(self.base + "/get_pixel", headers=self.headers) as resp:
-            headers = resp.headers
-            try:
-                self.get_limit = headers["requests-remaining"]
-            except KeyError:
-                self.get_limit = 0
-            if self.get_limit < headers["requests-limit"]:
-                self.get_timeout = datetime.datetime.now() + datetime.timedelta(seconds=float(headers['requests-reset']))
-            else:
-                self.get_timeout = datetime.datetime.now()
-
-        with self.__http.head(self.base + "/get_pixels", headers=self.headers) as resp:
-            headers = resp.headers
-            try:
-                self.gets_limit = headers["requests-remaining"]
-            except KeyError:
-                self.gets_limit = 0
-            if self.gets_limit < headers["requests-limit"]:
-                self.gets_timeout = datetime.datetime.now() + datetime.timedelta(seconds=float(headers['requests-reset']))
-            else:
-                self.gets_timeout = datetime.datetime.now()
-        
-    
-    def get_pixel(self, x: int, y: int):
+        self.hooks = []
+        self.metrics = Metrics()
+        self.subscribe(self.metrics)
+        if progress:
+            self.subscribe(RichProgress())
+
+        self.size_ttl = size_ttl
+        self._size = None
+        self._size_time = None
+
+        self.mirror = mirror
+        self._mirror = None
+        self._mirror_size = None
+        self._mirror_time = None
+
+    def get_pixel(self, x: int, y: int, max_staleness: typing.Optional[float] = None):
         """
         Returns the hexadecimal color code of the given pixel
         
         Params:
         x: int - The x position of the pixel
         y: int - The y position of the pixel
+        max_staleness: float - If the canvas mirror is enabled and its snapshot is at most this many seconds old, the pixel is read from the mirror instead of the API
 
         Returns:
         int - The color of the requested pixel
         """
-        
-        if self.get_limit == 0 and self.get_timeout > datetime.datetime.now():
-            timer = self.get_timeout - datetime.datetime.now()
-            for n in track(range(int(timer.total_seconds()) + 1), "[cyan bold]Awaiting /get_pixel rate limit.."):
-                time.sleep(1)
+        mirrored = max_staleness is not None and self._mirror is not None and (datetime.datetime.now() - self._mirror_time).total_seconds() <= max_staleness
+        # A fresh enough mirror has the size of its own snapshot, so reading from it needs no request at all
+        size = self._mirror_size if mirrored else self.get_size()
+        if x < 0 or y < 0 or x >= size[0] or y >= size[1]:
+            raise OutOfBoundsException("The selected pixel is out of bounds")
 
-        with self.__http.get(self.base + "/get_size", headers=self.headers) as resp:
-            data = resp.json()
-            size = (data["width"], data["height"])
-            if x > size[0] or y > size[1]:
-                raise OutOfBoundsException("The selected pixel is out of bounds")
+        if mirrored:
+            i = (y * size[0] + x) * 3
+            return int.from_bytes(self._mirror[i:i + 3], "big")
 
         data = {
             "x": x,
             "y": y
         }
 
-        with self.__http.get(self.base + "/get_pixel", headers = self.headers, params=data) as resp:
+        with self._request("get_pixel", "GET", "/get_pixel", params=data) as resp:
+            _check_response(resp.status_code, "/get_pixel")
             data = resp.json()
-            headers = resp.headers
-            try:
-                self.get_limit = int(headers["requests-remaining"])
-                self.get_timeout = datetime.datetime.now() + datetime.timedelta(seconds=float(headers['requests-reset']))
-            except KeyError:
-                self.get_limit = 0
-                self.get_timeout = datetime.datetime.now() + datetime.timedelta(seconds=float(headers['cooldown-reset']))
             return int(f"0x{data['rgb']}", base=16)
 
     def get_canvas(self, scale=1):
@@ -106,29 +97,67 @@ class Client:
         Returns:
         pillow.Image - The current canvas
         """
+        from PIL import Image
+
         if scale <=0:
             raise TypeError("Scale must be a positive integer")
-        if self.gets_limit == 0 and self.gets_timeout > datetime.datetime.now():
-            timer = self.gets_timeout - datetime.datetime.now()
-            for n in track(range(int(timer.total_seconds()) + 1), "[cyan bold]Awaiting /get_canvas rate limit.."):
-                time.sleep(1)
-        with self.__http.get(self.base + "/get_pixels", headers=self.headers) as resp:
-            headers = resp.headers
-            try:
-                self.gets_limit = int(headers["requests-remaining"])
-                self.gets_timeout = datetime.datetime.now() + datetime.timedelta(seconds=float(headers['requests-reset']))
-            except KeyError:
-                self.gets_limit = 0
-                self.gets_timeout = datetime.datetime.now() + datetime.timedelta(seconds=float(headers['cooldown-reset']))
-            with self.__http.get(self.base + "/get_size", headers= self.headers) as resps:
-                size = resps.json()
-                im =  Image.frombytes(mode="RGB", size=(size['width'], size['height']), data=resp.content)
-                im = im.resize((im.size[0]*scale, im.size[1]*scale), Image.NEAREST)
-                return im
-
-
-
-    
+        data, size = self._get_pixels()
+        im = Image.frombuffer("RGB", size, data, "raw", "RGB", 0, 1)
+        if scale > 1:
+            im = im.resize((im.size[0]*scale, im.size[1]*scale), Image.NEAREST)
+        return im
+
+    def get_raw_canvas(self, scale: int = 1, path: typing.Optional[str] = None):
+        """
+        Fetch the entire canvas without copying it into an image. Optionally scale it up by a whole factor, or write it to a memory mapped file
+
+        Params:
+        scale: int - A factor to scale the canvas by. Every pixel becomes a block of scale by scale pixels
+        path: str - A file to write the canvas to. The returned canvas is then a view of that file
+
+        Returns:
+        numpy.ndarray/memoryview - A (height, width, 3) array of the canvas when numpy is installed, otherwise a memoryview of the raw RGB bytes
+        """
+        if not isinstance(scale, int) or scale <= 0:
+            raise TypeError("Scale must be a positive integer")
+        data, size = self._get_pixels()
+        return _raw_canvas(data, size, scale, path)
+
+    def _get_pixels(self):
+        """
+        Fetches the raw RGB bytes of the entire canvas. Returns the bytes and the size of the canvas
+        """
+        size = self.get_size()
+        with self._request("get_canvas", "GET", "/get_pixels") as resp:
+            data = resp.content
+            _check_response(resp.status_code, "/get_pixels")
+        if len(data) != size[0] * size[1] * 3:
+            # The canvas may have been resized since its size was cached
+            self._size = None
+            size = self.get_size()
+        if len(data) != size[0] * size[1] * 3:
+            raise APIException(f"/get_pixels returned {len(data)} bytes, expected {size[0] * size[1] * 3} for a {size[0]}x{size[1]} canvas")
+
+        if self.mirror:
+            self._mirror = bytearray(data)
+            self._mirror_size = size
+            self._mirror_time = datetime.datetime.now()
+        return data, size
+
+    def refresh_mirror(self):
+        """
+        Fetches the entire canvas into the local mirror. The mirror must be enabled
+
+        Params:
+        None
+
+        Returns:
+        None
+        """
+        if not self.mirror:
+            raise TypeError("The canvas mirror is not enabled")
+        self._get_pixels()
+
     def get_size(self):
         """
         Returns the size of the canvas
@@ -139,11 +168,16 @@ class Client:
         Returns:
         tuple - The width and height of the canvas
         """
-        with self.__http.get(self.base + "/get_size", headers=self.headers) as resp:
+        if self._size is not None and datetime.datetime.now() - self._size_time < datetime.timedelta(seconds=self.size_ttl):
+            return self._size
+        with self._request("get_size", "GET", "/get_size", limited=False) as resp:
+            _check_response(resp.status_code, "/get_size")
             data = resp.json()
-            return (data["width"], data["height"])
+            self._size = (data["width"], data["height"])
+            self._size_time = datetime.datetime.now()
+            return self._size
 
-    def set_pixel(self, x: int, y: int, color: typing.Union[int, str]):
+    def set_pixel(self, x: int, y: int, color: typing.Union[int, str], max_staleness: typing.Optional[float] = None):
         """
         Sets a pixel on the canvas
 
@@ -151,49 +185,44 @@ class Client:
         x: int - The x position of the pixel
         y: int - The y position of the pixel
         color: int/str - the RGB colorcode of the pixel
+        max_staleness: float - The max staleness passed to get_pixel when checking the current color
 
         Returns:
         None
         """
-        if isinstance(color, str):
-            color = color.removeprefix("0x")
-            if len(color) != 6:
-                raise TypeError(f"Invalid color '{color}'")
-        else:
-            color = hex(color)[2:].upper()
+        color = _format_color(color)
+
+        curcolor = self.get_pixel(x, y, max_staleness)
+        if int(color, base=16) == curcolor:
+            return
 
+        self._post_pixel(x, y, color)
+
+    def _post_pixel(self, x: int, y: int, color: str, reserved: typing.Optional[float] = None):
+        """
+        Writes a pixel without checking its current color first. The color must already be formatted.
+        With reserved, the caller already waited that many seconds for a request reserved on the limiter. Raises an APIException when the write is rejected
+        """
         data = {
             "x": x,
             "y": y,
             "rgb": color
         }
 
-        curcolor = self.get_pixel(x, y)
-        if data["rgb"] == hex(curcolor)[2:]:
-            return
-
-        if len(data["rgb"]) > 6:
-            raise TypeError("The given color is invalid")
-        elif len(data["rgb"]) < 6:
-            while len(data["rgb"]) < 6:
-                data["rgb"] = "0" + data["rgb"]
-        if self.post_limit == 0 and self.post_timeout > datetime.datetime.now():
-            timer = self.post_timeout - datetime.datetime.now()
-            for n in track(range(int(timer.total_seconds()) + 1), "[cyan bold]Awaiting /set_pixel rate limit.."):
-                time.sleep(1)
-        with self.__http.post(self.base + "/set_pixel", headers=self.headers, json=data) as resp:
-            headers = resp.headers
-            try:
-                self.post_limit = int(headers["requests-remaining"])
-                self.post_timeout = datetime.datetime.now() + datetime.timedelta(seconds=float(headers['requests-reset']))
-            except KeyError:
-                self.post_limit = 0
-                self.post_timeout = datetime.datetime.now() + datetime.timedelta(seconds=float(headers['cooldown-reset']))
-            return
+        with self._request("set_pixel", "POST", "/set_pixel", reserved, json=data) as resp:
+            _check_response(resp.status_code, "/set_pixel")
+            if self._mirror is not None:
+                if x < self._mirror_size[0] and y < self._mirror_size[1]:
+                    i = (y * self._mirror_size[0] + x) * 3
+                    self._mirror[i:i + 3] = bytes.fromhex(color)
+                else:
+                    # The canvas grew since the snapshot, so the mirror is dropped until it is fetched again
+                    self._mirror = None
 
     def get_limits(self):
         """
-        Return the last known rate limits of the API. These are refreshed every request.
+        Return the live rate limits tracked by the client's rate limiter. These are refreshed every request.
+        An endpoint that has not been used yet has no known limit, and is returned as tuple(None, now)
 
         Params:
         None
@@ -204,16 +233,133 @@ class Client:
             "get_pixel": tuple(remaining, timeout)
             "get_canvas": tuple(remaining, timeout)
         """
-        limits = {
-            "set_pixel": (self.post_limit, self.post_timeout),
-            "get_pixel": (self.get_limit, self.get_timeout),
-            "get_canvas": (self.gets_limit, self.gets_timeout)
-        }
+        limits = dict.fromkeys(("set_pixel", "get_pixel", "get_canvas"), (None, datetime.datetime.now()))
+        limits.update(self.limiter.get_limits())
         return limits
 
-    def set_picture(self, ox: int, oy: int, img: typing.Union[str, Image.Image]):
+    def subscribe(self, hook: typing.Callable[[dict], None]):
+        """
+        Adds a hook that is called with every event of the client.
+        A "request" event is sent for every HTTP request with the endpoint, method, status, latency, bytes_sent, bytes_received,
+        the rate_limits headers of the response and the seconds it was blocked on the rate limit before it was sent.
+        A "wait" event with the endpoint and the expected delay is sent before the client waits on a rate limit
+
+        Params:
+        hook: callable - A function that takes the event dictionary
+
+        Returns:
+        None
+        """
+        self.hooks.append(hook)
+
+    def unsubscribe(self, hook: typing.Callable[[dict], None]):
+        """
+        Removes a hook added with subscribe
+
+        Params:
+        hook: callable - The hook to remove
+
+        Returns:
+        None
+        """
+        self.hooks.remove(hook)
+
+    def _emit(self, event: dict):
+        for hook in list(self.hooks):
+            hook(event)
+
+    def _request(self, endpoint: str, method: str, path: str, reserved: typing.Optional[float] = None, limited: bool = True, **kwargs):
+        """
+        Sends a rate limited request and tracks the limits it returns. Requests rejected by the rate limit are sent again once the cooldown is over,
+        up to RETRIES times. With reserved, the caller already waited that many seconds for a request reserved on the limiter
+        """
+        waited = 0.0
+        for attempt in range(self.RETRIES + 1):
+            if reserved is not None:
+                waited += reserved
+                reserved = None
+            elif limited:
+                waited += self._wait(endpoint)
+            started = time.perf_counter()
+            resp = self.__http.request(method, self.base + path, headers=self.headers, **kwargs)
+            latency = time.perf_counter() - started
+            if limited:
+                self.limiter.update(endpoint, resp.headers)
+            self._emit({
+                "event": "request",
+                "endpoint": endpoint,
+                "method": method,
+                "status": resp.status_code,
+                "latency": latency,
+                "bytes_sent": len(resp.request.body or b""),
+                "bytes_received": len(resp.content),
+                "rate_limits": {key: resp.headers[key] for key in RATE_LIMIT_HEADERS if key in resp.headers},
+                "waited": waited
+            })
+            if resp.status_code != 429:
+                return resp
+            resp.close()
+
+            waited = 0.0
+            delay = _backoff(resp.headers, self.BACKOFF * 2 ** attempt, limited)
+            if delay > 0 and attempt < self.RETRIES:
+                started = time.monotonic()
+                self._emit({"event": "wait", "endpoint": endpoint, "delay": delay})
+                time.sleep(delay)
+                waited = time.monotonic() - started
+        raise APIException(f"{path} is still rate limited after {self.RETRIES} retries")
+
+    def _wait(self, endpoint: str):
+        """
+        Reserves a request on an endpoint and sleeps until it may be sent. Returns the seconds actually blocked
+        """
+        delay = self.limiter.reserve(endpoint)
+        if delay <= 0:
+            return 0
+        started = time.monotonic()
+        self._emit({"event": "wait", "endpoint": endpoint, "delay": delay})
+        time.sleep(max(0, started + delay - time.monotonic()))
+        return time.monotonic() - started
+
+    def plan_picture(self, ox: int, oy: int, img: typing.Union[str, "Image.Image"]):
+        """
+        Compares a picture with offset x and y against the canvas and returns the pixels that need to be written.
+        The canvas is fetched once and fully transparent pixels are skipped.
+
+        Params:
+        ox: int - The x offset
+        oy: int- The y offset
+        img: typing.Union[str, pillow.Image.Image] - The image to compare. Can either be a path, a HTTP direct image link or a pillow image instance
+
+        Returns:
+        list - A list of (x, y, color) tuples for every pixel that differs from the canvas
+        """
+        image = self._load_image(img)
+
+        size = self.get_size()
+        if ox + image.width > size[0] or oy + image.height > size[1] or ox < 0 or oy < 0:
+            raise OutOfBoundsException("The image is out of bounds")
+
+        canvas, size = self._get_pixels()
+        return _diff_picture(image, canvas, size, ox, oy)
+
+    def execute_plan(self, plan: typing.Iterable[typing.Tuple[int, int, typing.Union[int, str]]]):
+        """
+        Writes every pixel of a plan made by plan_picture without reading the canvas again
+
+        Params:
+        plan: iterable - The (x, y, color) tuples to write
+
+        Returns:
+        None
+        """
+        for x, y, color in plan:
+            self._post_pixel(x, y, _format_color(color))
+
+    def set_picture(self, ox: int, oy: int, img: typing.Union[str, "Image.Image"]):
         """
         Starts a job to add a picture with offset x an y. Img can either be a file directory, an direct URL (Only HTTP supported) or a pillow.Image
+        Only the pixels that differ from the canvas are written
 
         Params:
         ox: int - The x offset
@@ -223,11 +369,81 @@ class Client:
         Returns:
         None
         """
-        if isinstance(img, str):                        
+        self.execute_plan(self.plan_picture(ox, oy, img))
+
+    def watch(self, region: typing.Optional[typing.Tuple[int, int, int, int]] = None, interval: float = 0):
+        """
+        Polls the canvas within the rate limit and yields the pixels that changed since the previous poll.
+        The first poll only takes a snapshot. Nothing is yielded when a poll has no changes
+
+        Params:
+        region: tuple - An optional (x, y, width, height) area to watch. The whole canvas is watched by default. It must lie within the canvas
+        interval: float - The minimum number of seconds between polls
+
+        Returns:
+        generator - Yields lists of (x, y, old color, new color) tuples
+        """
+        previous = None
+        while True:
+            started = time.monotonic()
+            canvas, size = self._get_pixels()
+            _check_region(region, size)
+            if previous is not None and len(previous) == len(canvas):
+                changes = _diff_canvas(previous, canvas, size, region)
+                if changes:
+                    yield changes
+            previous = canvas
+            time.sleep(max(0, interval - (time.monotonic() - started)))
+
+    def guard(self, ox: int, oy: int, img: typing.Union[str, "Image.Image"], batch_size: int = 10, interval: float = 0):
+        """
+        Keeps a picture with offset x and y on the canvas. Pixels that differ from the picture are repaired, the ones that differ the most first.
+        After the first poll only the pixels that changed are checked again
+
+        Params:
+        ox: int - The x offset
+        oy: int - The y offset
+        img: typing.Union[str, pillow.Image.Image] - The image to guard. Can either be a path, a HTTP direct image link or a pillow image instance
+        batch_size: int - The maximum number of pixels to repair between polls
+        interval: float - The minimum number of seconds between polls
+
+        Returns:
+        generator - Yields a list of the (x, y, color) tuples repaired after every poll
+        """
+        image = self._load_image(img)
+        size = self.get_size()
+        if ox + image.width > size[0] or oy + image.height > size[1] or ox < 0 or oy < 0:
+            raise OutOfBoundsException("The image is out of bounds")
+
+        guard = _Guard(image, ox, oy, size)
+        previous = None
+        while True:
+            started = time.monotonic()
+            canvas, size = self._get_pixels()
+            if previous is None or size != guard.size:
+                guard.reset(canvas, size)
+            else:
+                guard.update(_diff_canvas(previous, canvas, guard.size, guard.region), canvas)
+            previous = canvas
+
+            repairs = guard.take(batch_size)
+            for x, y, color in repairs:
+                self._post_pixel(x, y, color)
+            yield repairs
+            time.sleep(max(0, interval - (time.monotonic() - started)))
+
+    def _load_image(self, img: typing.Union[str, "Image.Image"]):
+        """
+        Opens an image from a path or HTTP link. Pillow images are returned as is
+        """
+        from PIL import Image
+
+        if isinstance(img, str):
             if img.startswith(("http://", "https://")):
                 with self.__http.get(img, stream=True) as r:
                     if r.status_code == 200:
                         image = Image.open(r.raw)
+                        image.load()
                     else:
                         raise TypeError("The given image could not be found")
             else:
@@ -238,29 +454,255 @@ class Client:
 
         else:
             image = img
+        return image
 
-        with self.__http.get(self.base + "/get_size", headers=self.headers) as resp:
-            data = resp.json()
-            size = (data["width"], data["height"])
-            if ox + image.width > size[0] or oy + image.height > size[1] or ox < 0 or oy < 0:
-                raise OutOfBoundsException("The image is out of bounds")
-        
-        for x in range(image.width):
-            for y in range(image.height):
-                color = image.getpixel((x,y))
-                r = color[0]
-                g = color[1]
-                b = color[2]
-                try:
-                    a = color[3]
-                except IndexError:
-                    a = 255
-                if a == 0:
-                    continue
-                color = f"{r:02X}{g:02X}{b:02X}"
-                cur = self.get_pixel(x + ox,y + oy)
-                if cur == int(color, base=16):
-                    continue
-
-                self.set_pixel(x + ox, y + oy, color)
 
+def _backoff(headers: typing.Mapping[str, str], fallback: float, limited: bool = True):
+    """
+    Returns how long to wait before sending a rate limited request again. A limited request whose response has rate limit headers
+    is already held back by the rate limiter. Otherwise the cooldown-reset or Retry-After header is used, or the fallback when neither is given
+    """
+    if limited and ("cooldown-reset" in headers or "requests-reset" in headers):
+        return 0
+    for key in ("cooldown-reset", "Retry-After"):
+        try:
+            return max(0.0, float(headers[key]))
+        except (KeyError, ValueError):
+            pass
+    return fallback
+
+
+def _check_response(status: int, path: str):
+    """
+    Raises an APIException for an error status
+    """
+    if not 200 <= status < 300:
+        raise APIException(f"{path} returned status {status}")
+
+
+def _format_color(color: typing.Union[int, str]):
+    """
+    Formats a color as the 6 digit hexadecimal string the API expects
+    """
+    if isinstance(color, str):
+        color = color.removeprefix("0x")
+        if len(color) != 6:
+            raise TypeError(f"Invalid color '{color}'")
+    else:
+        color = hex(color)[2:]
+
+    if len(color) > 6:
+        raise TypeError("The given color is invalid")
+    return color.upper().rjust(6, "0")
+
+
+def _diff_picture(image: "Image.Image", canvas: bytes, size: typing.Tuple[int, int], ox: int, oy: int):
+    """
+    Compares an image placed at ox, oy with the raw RGB canvas bytes.
+    Returns (x, y, color) tuples for the visible pixels that differ, column by column
+    """
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+
+    source = image.convert("RGBA")
+    width, height = source.size
+    data = source.tobytes()
+
+    if numpy is not None:
+        src = numpy.frombuffer(data, dtype=numpy.uint8).reshape(height, width, 4)
+        cur = numpy.frombuffer(canvas, dtype=numpy.uint8).reshape(size[1], size[0], 3)[oy:oy + height, ox:ox + width]
+        mask = (src[..., 3] != 0) & (src[..., :3] != cur).any(axis=2)
+        xs, ys = numpy.nonzero(mask.T)
+        colors = src[ys, xs, :3]
+        return [
+            (int(x) + ox, int(y) + oy, f"{r:02X}{g:02X}{b:02X}")
+            for x, y, (r, g, b) in zip(xs, ys, colors.tolist())
+        ]
+
+    plan = []
+    for x in range(width):
+        for y in range(height):
+            s = (y * width + x) * 4
+            if data[s + 3] == 0:
+                continue
+            c = ((y + oy) * size[0] + x + ox) * 3
+            if data[s:s + 3] == canvas[c:c + 3]:
+                continue
+            plan.append((x + ox, y + oy, data[s:s + 3].hex().upper()))
+    return plan
+
+
+def _raw_canvas(data: bytes, size: typing.Tuple[int, int], scale: int = 1, path: typing.Optional[str] = None):
+    """
+    Wraps raw RGB canvas bytes without copying them. Scaling repeats every pixel in whole blocks,
+    and with a path the result is written into a memory mapped file instead of a new buffer
+    """
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+
+    width, height = size
+    out = None
+    if path is not None:
+        length = width * scale * height * scale * 3
+        with open(path, "w+b") as file:
+            file.truncate(length)
+            out = mmap.mmap(file.fileno(), length)
+
+    if numpy is not None:
+        canvas = numpy.frombuffer(data, dtype=numpy.uint8).reshape(height, width, 3)
+        blocks = canvas[:, None, :, None, :]
+        if out is None:
+            if scale == 1:
+                return canvas
+            return numpy.broadcast_to(blocks, (height, scale, width, scale, 3)).reshape(height * scale, width * scale, 3)
+        result = numpy.frombuffer(out, dtype=numpy.uint8).reshape(height * scale, width * scale, 3)
+        result.reshape(height, scale, width, scale, 3)[...] = blocks
+        return result
+
+    if scale > 1:
+        row = width * 3
+        data = b"".join(
+            b"".join(data[i:i + 3] * scale for i in range(y * row, (y + 1) * row, 3)) * scale
+            for y in range(height)
+        )
+    if out is None:
+        return memoryview(data)
+    out[:] = data
+    return memoryview(out)
+
+
+def _check_region(region: typing.Optional[typing.Tuple[int, int, int, int]], size: typing.Tuple[int, int]):
+    """
+    Raises an OutOfBoundsException for a region that does not lie within the canvas
+    """
+    if region is None:
+        return
+    x, y, width, height = region
+    if x < 0 or y < 0 or width < 0 or height < 0 or x + width > size[0] or y + height > size[1]:
+        raise OutOfBoundsException("The region is out of bounds")
+
+
+def _diff_canvas(old: bytes, new: bytes, size: typing.Tuple[int, int], region: typing.Optional[typing.Tuple[int, int, int, int]] = None):
+    """
+    Compares two raw RGB canvas snapshots of the same size.
+    Returns (x, y, old color, new color) tuples for the pixels that differ, row by row
+    """
+    _check_region(region, size)
+    try:
+        import numpy
+    except ImportError:
+        numpy = None
+
+    rx, ry, rw, rh = region if region is not None else (0, 0, size[0], size[1])
+
+    if numpy is not None:
+        a = numpy.frombuffer(old, dtype=numpy.uint8).reshape(size[1], size[0], 3)[ry:ry + rh, rx:rx + rw]
+        b = numpy.frombuffer(new, dtype=numpy.uint8).reshape(size[1], size[0], 3)[ry:ry + rh, rx:rx + rw]
+        ys, xs = numpy.nonzero((a != b).any(axis=2))
+        weights = numpy.array([1 << 16, 1 << 8, 1], dtype=numpy.uint32)
+        olds = (a[ys, xs].astype(numpy.uint32) * weights).sum(axis=1)
+        news = (b[ys, xs].astype(numpy.uint32) * weights).sum(axis=1)
+        return list(zip((xs + rx).tolist(), (ys + ry).tolist(), olds.tolist(), news.tolist()))
+
+    changes = []
+    for y in range(ry, ry + rh):
+        start = (y * size[0] + rx) * 3
+        end = start + rw * 3
+        # Whole rows are compared at once, only rows that changed are compared pixel by pixel
+        if old[start:end] == new[start:end]:
+            continue
+        for i in range(start, end, 3):
+            if old[i:i + 3] != new[i:i + 3]:
+                changes.append((i // 3 % size[0], y, int.from_bytes(old[i:i + 3], "big"), int.from_bytes(new[i:i + 3], "big")))
+    return changes
+
+
+def dirty_rects(changes: typing.Iterable[typing.Tuple[int, ...]]):
+    """
+    Merges changed pixels into rectangles. Pixels next to each other in a row form a run,
+    and runs that cover the same columns in consecutive rows are joined
+
+    Params:
+    changes: iterable - The changes yielded by watch, or any (x, y, ...) tuples
+
+    Returns:
+    list - A list of (x, y, width, height) rectangles
+    """
+    runs = []
+    for x, y, *rest in sorted(changes, key=lambda c: (c[1], c[0])):
+        if runs and runs[-1][1] == y and runs[-1][2] == x - 1:
+            runs[-1][2] = x
+        else:
+            runs.append([x, y, x])
+
+    rects = []
+    open_rects = {}
+    for x0, y, x1 in runs:
+        rect = open_rects.get((x0, x1))
+        if rect is not None and rect[1] + rect[3] == y:
+            rect[3] += 1
+        else:
+            rect = [x0, y, x1 - x0 + 1, 1]
+            rects.append(rect)
+            open_rects[(x0, x1)] = rect
+    return [tuple(rect) for rect in rects]
+
+
+class _Guard:
+    """
+    The repair queue of a guarded picture. It is filled from a full snapshot once, and after that only from the pixels that changed
+    """
+
+    def __init__(self, image: "Image.Image", ox: int, oy: int, size: typing.Tuple[int, int]):
+        self.image = image.convert("RGBA")
+        self.target = self.image.tobytes()
+        self.ox = ox
+        self.oy = oy
+        self.size = size
+        self.region = (ox, oy, self.image.width, self.image.height)
+        self.pending = {}
+        self.written = []
+
+    def reset(self, canvas: bytes, size: typing.Tuple[int, int]):
+        if self.ox + self.image.width > size[0] or self.oy + self.image.height > size[1]:
+            raise OutOfBoundsException("The canvas was resized and the image is out of bounds")
+        self.size = size
+        self.pending = {}
+        self.written = []
+        for x, y, color in _diff_picture(self.image, canvas, self.size, self.ox, self.oy):
+            c = (y * self.size[0] + x) * 3
+            self._queue(x, y, int.from_bytes(canvas[c:c + 3], "big"))
+
+    def update(self, changes: typing.Iterable[typing.Tuple[int, int, int, int]], canvas: bytes):
+        for x, y, old, new in changes:
+            self._queue(x, y, new)
+        # A repair that did not land shows up as no change at all, so the pixels written last are checked again
+        for x, y in self.written:
+            c = (y * self.size[0] + x) * 3
+            self._queue(x, y, int.from_bytes(canvas[c:c + 3], "big"))
+        self.written = []
+
+    def _queue(self, x: int, y: int, current: int):
+        i = ((y - self.oy) * self.image.width + x - self.ox) * 4
+        if self.target[i + 3] == 0:
+            return
+        target = int.from_bytes(self.target[i:i + 3], "big")
+        if target == current:
+            self.pending.pop((x, y), None)
+            return
+        drift = sum((a - b) ** 2 for a, b in zip(target.to_bytes(3, "big"), current.to_bytes(3, "big")))
+        self.pending[(x, y)] = (drift, target)
+
+    def take(self, count: int):
+        """
+        Removes and returns the repairs with the most drift
+        """
+        repairs = heapq.nlargest(count, self.pending.items(), key=lambda item: item[1][0])
+        for (x, y), _ in repairs:
+            del self.pending[(x, y)]
+            self.written.append((x, y))
+        return [(x, y, f"{target:06X}") for (x, y), (drift, target) in repairs]
@@ -0,0 +1,192 @@
+import json
+import threading
+import time
+import typing
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_LIMITS = {
+    "set_pixel": (2, 1.0),
+    "get_pixel": (8, 1.0),
+    "get_pixels": (5, 1.0)
+}
+
+
+class StandInServer:
+    """
+    A local stand-in for the pixels API, for testing and benchmarking without spending real rate limits.
+    It serves /get_size, /get_pixel, /get_pixels and /set_pixel with the same rate limit headers as the real API.
+    Every token gets its own fixed window of requests per endpoint. Going over it returns a 429 with a cooldown-reset header.
+    """
+
+    def __init__(self, width: int = 160, height: int = 90, limits: typing.Optional[typing.Dict[str, typing.Tuple[int, float]]] = None, latency: float = 0, host: str = "127.0.0.1", port: int = 0):
+        self.width = width
+        self.height = height
+        self.canvas = bytearray(width * height * 3)
+        self.limits = dict(DEFAULT_LIMITS, **(limits or {}))
+        self.latency = latency
+        self.counts = {}
+        self.bytes_sent = 0
+        self._windows = {}
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer((host, port), _Handler)
+        self._server.daemon_threads = True
+        self._server.stand_in = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def start(self):
+        """
+        Starts serving in a background thread
+
+        Params:
+        None
+
+        Returns:
+        None
+        """
+        if self._thread is None:
+            # A short poll interval keeps stop from waiting half a second
+            self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """
+        Stops serving and closes the socket
+
+        Params:
+        None
+
+        Returns:
+        None
+        """
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread = None
+
+    def reset_counts(self):
+        """
+        Clears the request and byte counters
+
+        Params:
+        None
+
+        Returns:
+        None
+        """
+        with self._lock:
+            self.counts = {}
+            self.bytes_sent = 0
+
+    def _limit(self, token: str, endpoint: str, consume: bool = True):
+        """
+        Counts a request against a token's window and returns the rate limit headers, and whether the request is allowed.
+        HEAD requests only look at the window
+        """
+        limit, period = self.limits[endpoint]
+        now = time.monotonic()
+        with self._lock:
+            self.counts[endpoint] = self.counts.get(endpoint, 0) + 1
+            start, used = self._windows.get((token, endpoint), (now, 0))
+            if now - start >= period:
+                start, used = now, 0
+            reset = period - (now - start)
+            if used >= limit:
+                self._windows[(token, endpoint)] = (start, used)
+                return {"cooldown-reset": f"{reset:.3f}"}, False
+            if consume:
+                used += 1
+            self._windows[(token, endpoint)] = (start, used)
+        return {
+            "requests-remaining": str(limit - used),
+            "requests-limit": str(limit),
+            "requests-period": str(period),
+            "requests-reset": f"{reset:.3f}"
+        }, True
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and body are written separately, which would otherwise stall every keep-alive response on a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status: int, body: bytes = b"", headers: typing.Optional[typing.Dict[str, str]] = None, content_type: str = "application/json"):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+            with self.server.stand_in._lock:
+                self.server.stand_in.bytes_sent += len(body)
+
+    def _json(self, status: int, data, headers: typing.Optional[typing.Dict[str, str]] = None):
+        self._send(status, json.dumps(data).encode(), headers)
+
+    def _handle(self, endpoint: str, body: bytes):
+        stand_in = self.server.stand_in
+        if stand_in.latency:
+            time.sleep(stand_in.latency)
+
+        if endpoint == "get_size":
+            with stand_in._lock:
+                stand_in.counts["get_size"] = stand_in.counts.get("get_size", 0) + 1
+            return self._json(200, {"width": stand_in.width, "height": stand_in.height})
+
+        auth = self.headers.get("Authorization", "")
+        if not auth.startswith("Bearer "):
+            return self._json(401, {"message": "Missing token"})
+
+        headers, allowed = stand_in._limit(auth[7:], endpoint, self.command != "HEAD")
+        if self.command == "HEAD":
+            return self._send(200, headers=headers)
+        if not allowed:
+            return self._json(429, {"message": "Rate limited"}, headers)
+
+        if endpoint == "get_pixels":
+            return self._send(200, bytes(stand_in.canvas), headers, "application/octet-stream")
+
+        if endpoint == "get_pixel":
+            query = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
+            x, y = int(query["x"][0]), int(query["y"][0])
+        else:
+            data = json.loads(body)
+            x, y = data["x"], data["y"]
+
+        if not (0 <= x < stand_in.width and 0 <= y < stand_in.height):
+            return self._json(422, {"message": "Pixel out of bounds"}, headers)
+        i = (y * stand_in.width + x) * 3
+
+        if endpoint == "get_pixel":
+            return self._json(200, {"rgb": stand_in.canvas[i:i + 3].hex()}, headers)
+        stand_in.canvas[i:i + 3] = bytes.fromhex(data["rgb"])
+        return self._json(200, {"message": f"added pixel to {x},{y}"}, headers)
+
+    def _route(self):
+        # The body is always read, even when it is rejected, so the next request on a keep-alive connection starts at its own request line
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        path = urllib.parse.urlparse(self.path).path.strip("/")
+        endpoints = {"get_size": ("GET", "HEAD"), "get_pixel": ("GET", "HEAD"), "get_pixels": ("GET", "HEAD"), "set_pixel": ("POST", "HEAD")}
+        if path not in endpoints:
+            return self._json(404, {"message": "Not found"})
+        if self.command not in endpoints[path]:
+            return self._json(405, {"message": "Method not allowed"})
+        self._handle(path, body)
+
+    do_GET = do_HEAD = do_POST = _route
@@ -7,6 +7,7 @@ setup(
     name="pythonpixels",
     packages=["pythonpixels",],
     install_requires=["pillow","rich"],
+    extras_require={"async": ["aiohttp"]},
     description="An API wrapper for the python discord pixels project",
     version="1.2.14",
     long_description=long_des,
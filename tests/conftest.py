@@ -0,0 +1,46 @@
+import sys
+
+import pytest
+
+import pythonpixels
+from pythonpixels.server import StandInServer
+
+# Generous limits, so only the tests that are about rate limits ever wait on one
+LIMITS = {
+    "set_pixel": (1000, 1.0),
+    "get_pixel": (1000, 1.0),
+    "get_pixels": (1000, 1.0)
+}
+
+
+@pytest.fixture
+def server():
+    with StandInServer(16, 8, limits=LIMITS) as server:
+        yield server
+
+
+@pytest.fixture
+def client(server):
+    return pythonpixels.Client("token", base=server.url, progress=False)
+
+
+@pytest.fixture(params=["numpy", "pure"])
+def numpy_mode(request, monkeypatch):
+    """
+    Runs a test with numpy, and again with the pure Python fallback
+    """
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setitem(sys.modules, "numpy", None)
+    return request.param
+
+
+def paint(server, x, y, rgb):
+    i = (y * server.width + x) * 3
+    server.canvas[i:i + 3] = bytes(rgb)
+
+
+def pixel(server, x, y):
+    i = (y * server.width + x) * 3
+    return tuple(server.canvas[i:i + 3])
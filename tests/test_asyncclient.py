@@ -0,0 +1,99 @@
+import asyncio
+
+import pytest
+from PIL import Image
+
+import pythonpixels
+from pythonpixels.server import StandInServer
+
+from conftest import paint, pixel
+
+pytest.importorskip("aiohttp")
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+def test_get_pixel_and_set_picture(server, numpy_mode):
+    paint(server, 2, 3, (1, 2, 3))
+
+    async def main():
+        async with pythonpixels.AsyncClient("token", base=server.url) as client:
+            assert await client.get_pixel(2, 3) == 0x010203
+            await client.set_picture(0, 0, Image.new("RGB", (4, 4), (5, 6, 7)))
+            return (await client.get_canvas()).getpixel((3, 3))
+
+    assert run(main()) == (5, 6, 7)
+    assert server.counts["set_pixel"] == 16
+
+
+def test_rate_limited_request_is_retried():
+    with StandInServer(16, 8, limits={"set_pixel": (1, 0.5)}) as server:
+        async def main():
+            async with pythonpixels.AsyncClient("shared", base=server.url) as first, pythonpixels.AsyncClient("shared", base=server.url) as second:
+                await first._post_pixel(0, 0, "FF0000")
+                await second._post_pixel(1, 0, "00FF00")
+                return second.metrics.as_dict()["set_pixel"]["requests"]
+
+        assert run(main()) == {"429": 1, "200": 1}
+        assert pixel(server, 1, 0) == (0, 255, 0)
+
+
+def test_errors_raise(server):
+    async def main():
+        async with pythonpixels.AsyncClient("token", base=server.url) as client:
+            client.headers = {}
+            await client.close()
+            with pytest.raises(pythonpixels.APIException):
+                await client.get_canvas()
+            with pytest.raises(pythonpixels.APIException):
+                await client.get_pixel(1, 1)
+            with pytest.raises(pythonpixels.APIException):
+                await client._post_pixel(0, 0, "FFFFFF")
+
+    run(main())
+
+
+def test_file_limiter(server, tmp_path):
+    limiter = pythonpixels.RateLimiter(str(tmp_path / "limits.json"))
+
+    async def main():
+        async with pythonpixels.AsyncClient("token", base=server.url, limiter=limiter) as client:
+            await client.get_pixel(0, 0)
+            await client.get_pixel(1, 0)
+
+    run(main())
+    assert set(limiter.get_limits()) == {"get_pixel"}
+
+
+def test_rate_limited_without_headers_backs_off(server, monkeypatch):
+    monkeypatch.setattr(server, "_limit", lambda token, endpoint, consume=True: ({"Retry-After": "0.01"}, False))
+
+    async def main():
+        async with pythonpixels.AsyncClient("token", base=server.url) as client:
+            with pytest.raises(pythonpixels.APIException):
+                await client.get_pixel(0, 0)
+            return client.metrics.as_dict()["get_pixel"]
+
+    data = run(main())
+    assert data["requests"] == {"429": 6}
+    assert data["waits"] == 5
+
+
+def test_cancelled_wait_gives_back_its_reservation(server):
+    limiter = pythonpixels.RateLimiter()
+    limiter.update("get_pixel", {"requests-remaining": "0", "requests-limit": "2", "requests-period": "10", "requests-reset": "10"})
+
+    async def main():
+        async with pythonpixels.AsyncClient("token", base=server.url, limiter=limiter) as client:
+            task = asyncio.create_task(client.get_pixel(0, 0))
+            await asyncio.sleep(0.05)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+
+    run(main())
+    # The window after the cooldown still has both of its requests
+    assert limiter.get_limits()["get_pixel"][0] == 2
+    assert "get_pixel" not in server.counts
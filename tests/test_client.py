@@ -0,0 +1,216 @@
+import time
+
+import pytest
+from PIL import Image
+
+import pythonpixels
+from pythonpixels.pythonpixel import _diff_canvas
+from pythonpixels.server import StandInServer
+
+from conftest import paint, pixel
+
+
+def test_get_pixel_and_canvas(server, client):
+    paint(server, 3, 2, (1, 2, 3))
+
+    assert client.get_pixel(3, 2) == 0x010203
+    assert client.get_canvas().getpixel((3, 2)) == (1, 2, 3)
+    assert client.get_canvas(2).size == (32, 16)
+    # The size is cached, so every canvas fetch is a single request
+    assert server.counts == {"get_size": 1, "get_pixel": 1, "get_pixels": 2}
+
+
+def test_get_limits(client):
+    assert {endpoint: remaining for endpoint, (remaining, reset) in client.get_limits().items()} == {"set_pixel": None, "get_pixel": None, "get_canvas": None}
+
+    client.get_pixel(0, 0)
+
+    assert client.get_limits()["get_pixel"][0] == 999
+    assert client.get_limits()["set_pixel"][0] is None
+
+
+def test_get_pixel_out_of_bounds(client):
+    with pytest.raises(pythonpixels.OutOfBoundsException):
+        client.get_pixel(16, 0)
+    with pytest.raises(pythonpixels.OutOfBoundsException):
+        client.get_pixel(-1, 0)
+
+
+def test_mirror_reads_send_no_requests(server):
+    client = pythonpixels.Client("token", base=server.url, mirror=True, progress=False)
+    paint(server, 1, 1, (9, 9, 9))
+    client.refresh_mirror()
+    server.reset_counts()
+
+    assert client.get_pixel(1, 1, max_staleness=60) == 0x090909
+    client.set_pixel(1, 1, 0x090909, max_staleness=60)
+    with pytest.raises(pythonpixels.OutOfBoundsException):
+        client.get_pixel(16, 1, max_staleness=60)
+    assert server.counts == {}
+
+
+def test_mirror_is_dropped_after_resize(server):
+    client = pythonpixels.Client("token", base=server.url, mirror=True, size_ttl=0, progress=False)
+    client.refresh_mirror()
+    server.width, server.height, server.canvas = 20, 10, bytearray(20 * 10 * 3)
+
+    client.execute_plan([(19, 9, 0xFFFFFF)])
+
+    assert client._mirror is None
+    assert client.get_pixel(19, 9, max_staleness=60) == 0xFFFFFF
+
+
+def test_plan_picture(server, client, numpy_mode):
+    image = Image.new("RGBA", (3, 2), (200, 100, 50, 255))
+    image.putpixel((1, 0), (0, 0, 0, 0))
+    paint(server, 5, 4, (200, 100, 50))
+
+    # Transparent and matching pixels are skipped, the rest come column by column
+    assert client.plan_picture(4, 4, image) == [
+        (4, 4, "C86432"), (4, 5, "C86432"), (5, 5, "C86432"), (6, 4, "C86432"), (6, 5, "C86432")
+    ]
+    with pytest.raises(pythonpixels.OutOfBoundsException):
+        client.plan_picture(14, 0, image)
+
+
+def test_set_picture_writes_only_changes(server, client, numpy_mode):
+    image = Image.new("RGB", (4, 4), (10, 20, 30))
+    paint(server, 0, 0, (10, 20, 30))
+
+    client.set_picture(0, 0, image)
+
+    assert server.counts["set_pixel"] == 15
+    assert all(pixel(server, x, y) == (10, 20, 30) for x in range(4) for y in range(4))
+
+
+def test_raw_canvas(server, client, numpy_mode):
+    paint(server, 0, 0, (1, 2, 3))
+    paint(server, 15, 7, (4, 5, 6))
+
+    raw = bytes(client.get_raw_canvas(2))
+
+    assert len(raw) == 32 * 16 * 3
+    assert raw[:6] == bytes((1, 2, 3, 1, 2, 3))
+    assert raw[-6:] == bytes((4, 5, 6, 4, 5, 6))
+    assert raw[32 * 3:32 * 3 + 3] == bytes((1, 2, 3))
+
+
+def test_raw_canvas_to_file(server, client, numpy_mode, tmp_path):
+    paint(server, 2, 1, (7, 8, 9))
+    path = tmp_path / "canvas.rgb"
+
+    client.get_raw_canvas(1, str(path))
+
+    assert path.read_bytes() == bytes(server.canvas)
+
+
+def test_diff_canvas_and_dirty_rects(numpy_mode):
+    old = bytes(4 * 3 * 3)
+    new = bytearray(old)
+    for x, y in ((1, 0), (2, 0), (1, 1), (2, 1), (0, 2)):
+        i = (y * 4 + x) * 3
+        new[i:i + 3] = b"\x00\x00\x01"
+
+    changes = _diff_canvas(old, bytes(new), (4, 3))
+
+    assert changes == [(1, 0, 0, 1), (2, 0, 0, 1), (1, 1, 0, 1), (2, 1, 0, 1), (0, 2, 0, 1)]
+    assert _diff_canvas(old, bytes(new), (4, 3), (1, 1, 2, 2)) == [(1, 1, 0, 1), (2, 1, 0, 1)]
+    assert pythonpixels.dirty_rects(changes) == [(1, 0, 2, 2), (0, 2, 1, 1)]
+    # A region past the end of a row would otherwise wrap into the next one
+    with pytest.raises(pythonpixels.OutOfBoundsException):
+        _diff_canvas(old, bytes(new), (4, 3), (3, 0, 2, 1))
+
+
+def test_watch_rejects_region_outside_canvas(client):
+    with pytest.raises(pythonpixels.OutOfBoundsException):
+        next(client.watch(region=(14, 0, 4, 1)))
+
+
+def test_rate_limited_request_is_retried():
+    with StandInServer(16, 8, limits={"set_pixel": (1, 0.5)}) as server:
+        first = pythonpixels.Client("shared", base=server.url, progress=False)
+        second = pythonpixels.Client("shared", base=server.url, progress=False)
+
+        first._post_pixel(0, 0, "FF0000")
+        # The second client has not learned the limit yet, so it is rejected once and sends the write again
+        second._post_pixel(1, 0, "00FF00")
+
+        assert second.metrics.as_dict()["set_pixel"]["requests"] == {"429": 1, "200": 1}
+        assert pixel(server, 1, 0) == (0, 255, 0)
+        # The connection is still usable after the rejected request
+        assert second.get_size() == (16, 8)
+
+
+def test_errors_raise(server, client):
+    client.headers = {}
+
+    with pytest.raises(pythonpixels.APIException):
+        client.get_canvas()
+    with pytest.raises(pythonpixels.APIException):
+        client.get_pixel(1, 1)
+    with pytest.raises(pythonpixels.APIException):
+        client.set_pixel(1, 1, 0xFF)
+    with pytest.raises(pythonpixels.APIException):
+        client.set_picture(0, 0, Image.new("RGB", (1, 1), (255, 255, 255)))
+
+
+def test_canvas_resize_is_noticed(server, client):
+    client.get_canvas()
+    server.width, server.height, server.canvas = 20, 10, bytearray(20 * 10 * 3)
+
+    assert client.get_canvas().size == (20, 10)
+
+
+def test_guard_repairs_and_follows_resize(server, client):
+    image = Image.new("RGB", (2, 2), (255, 0, 0))
+    guard = client.guard(1, 1, image, batch_size=10)
+
+    assert len(next(guard)) == 4
+    assert next(guard) == []
+    paint(server, 2, 2, (0, 0, 0))
+    assert next(guard) == [(2, 2, "FF0000")]
+
+    server.width, server.height, server.canvas = 2, 2, bytearray(2 * 2 * 3)
+    client.size_ttl = 0
+    with pytest.raises(pythonpixels.OutOfBoundsException):
+        next(guard)
+
+
+def test_events(server, client):
+    events = []
+    client.subscribe(events.append)
+
+    client.get_pixel(0, 0)
+
+    assert [event["event"] for event in events] == ["request", "request"]
+    assert events[-1]["endpoint"] == "get_pixel" and events[-1]["status"] == 200
+    assert 'pythonpixels_requests_total{endpoint="get_pixel",status="200"} 1' in client.metrics.to_prometheus()
+
+
+def test_rate_limited_without_headers_backs_off(server, client, monkeypatch):
+    # A 429 from a proxy carries none of the API's rate limit headers
+    monkeypatch.setattr(server, "_limit", lambda token, endpoint, consume=True: ({}, False))
+    client.BACKOFF = 0.01
+    waits = []
+    client.subscribe(lambda event: event["event"] == "wait" and waits.append(event["delay"]))
+
+    with pytest.raises(pythonpixels.APIException):
+        client.get_pixel(0, 0)
+
+    assert client.metrics.as_dict()["get_pixel"]["requests"] == {"429": client.RETRIES + 1}
+    assert waits == [0.01, 0.02, 0.04, 0.08, 0.16]
+
+
+def test_waited_is_the_time_blocked(server, client):
+    client.limiter.update("get_pixel", {"requests-remaining": "0", "requests-limit": "5", "requests-period": "1", "requests-reset": "0.05"})
+    waits = []
+    # A slow hook keeps the client blocked past the expected delay
+    client.subscribe(lambda event: event["event"] == "wait" and (waits.append(event["delay"]), time.sleep(0.2)))
+    events = []
+    client.subscribe(events.append)
+
+    client.get_pixel(0, 0)
+
+    assert waits[0] <= 0.05
+    assert events[-1]["waited"] >= 0.2
+    assert client.metrics.as_dict()["get_pixel"]["waited"] >= 0.2
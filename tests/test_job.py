@@ -0,0 +1,78 @@
+from PIL import Image
+import pytest
+
+import pythonpixels
+
+from conftest import paint, pixel
+
+
+def test_job_runs_and_checkpoints(server, client, tmp_path):
+    path = str(tmp_path / "job.json")
+    job = pythonpixels.PictureJob.create(client, 0, 0, Image.new("RGB", (3, 3), (1, 2, 3)), order="center", path=path)
+
+    assert job.total == 9
+    job.run(batch_size=4)
+
+    assert job.remaining == 0
+    assert all(pixel(server, x, y) == (1, 2, 3) for x in range(3) for y in range(3))
+    assert pythonpixels.PictureJob.resume(client, path).total == 0
+
+
+def test_job_stops_at_rejected_write_and_resumes(server, client, tmp_path):
+    path = str(tmp_path / "job.json")
+    job = pythonpixels.PictureJob.create(client, 0, 0, Image.new("RGB", (3, 3), (1, 2, 3)), path=path)
+    job.run(batch_size=2)
+    paint(server, 0, 0, (0, 0, 0))
+
+    job = pythonpixels.PictureJob.create(client, 4, 0, Image.new("RGB", (3, 3), (4, 5, 6)), path=path)
+    post = client._post_pixel
+    sent = []
+
+    def expire(*args, **kwargs):
+        # The token expires after five writes
+        if len(sent) == 5:
+            client.headers = {}
+        sent.append(args)
+        return post(*args, **kwargs)
+
+    client._post_pixel = expire
+    with pytest.raises(pythonpixels.APIException):
+        job.run(batch_size=2)
+    assert job.cursor == 5 and job.remaining == 4
+
+    client.headers = {"Authorization": "Bearer token"}
+    client._post_pixel = post
+    job = pythonpixels.PictureJob.resume(client, path)
+    assert job.total == 4
+    job.run()
+
+    assert all(pixel(server, x, y) == (4, 5, 6) for x in range(4, 7) for y in range(3))
+    # The first job is not part of the checkpoint, so its overwritten pixel stays
+    assert pixel(server, 0, 0) == (0, 0, 0)
+
+
+def test_resume_writes_overwritten_pixels_first(server, client, tmp_path):
+    path = str(tmp_path / "job.json")
+    job = pythonpixels.PictureJob.create(client, 0, 0, Image.new("RGB", (2, 2), (1, 2, 3)), order="rows", path=path)
+    job.cursor = 2
+    job.run(batch_size=1)
+    paint(server, 0, 0, (9, 9, 9))
+    job.cursor = 2
+    job.save()
+
+    job = pythonpixels.PictureJob.resume(client, path)
+
+    # (0, 0) was written and overwritten since, (1, 0) was never written, the rest is on the canvas already
+    assert list(zip(job.xs, job.ys)) == [(0, 0), (1, 0)]
+
+
+def test_orderings(client):
+    image = Image.new("RGBA", (3, 3), (1, 1, 1, 255))
+    plan = [(x, y, 0x010101) for x in range(3) for y in range(3)]
+    canvas = bytes(16 * 8 * 3)
+
+    assert pythonpixels.order_rows(plan, image, 0, 0, canvas, (16, 8))[:3] == [(0, 0, 0x010101), (1, 0, 0x010101), (2, 0, 0x010101)]
+    assert pythonpixels.order_center(plan, image, 0, 0, canvas, (16, 8))[0] == (1, 1, 0x010101)
+    assert pythonpixels.order_outline(plan, image, 0, 0, canvas, (16, 8))[-1] == (1, 1, 0x010101)
+    with pytest.raises(TypeError):
+        pythonpixels.PictureJob.create(client, 0, 0, image, order="spiral")
@@ -0,0 +1,35 @@
+import pythonpixels
+
+HEADERS = {"requests-remaining": "1", "requests-limit": "2", "requests-period": "10", "requests-reset": "10"}
+
+
+def test_reserve_waits_once_the_window_is_used():
+    limiter = pythonpixels.RateLimiter()
+    assert limiter.reserve("set_pixel") == 0
+
+    limiter.update("set_pixel", HEADERS)
+
+    assert limiter.reserve("set_pixel") == 0
+    assert 9 < limiter.reserve("set_pixel") <= 10
+
+
+def test_release_gives_back_a_reservation():
+    limiter = pythonpixels.RateLimiter()
+    limiter.update("set_pixel", HEADERS)
+
+    limiter.reserve("set_pixel")
+    limiter.release("set_pixel")
+
+    assert limiter.reserve("set_pixel") == 0
+
+
+def test_file_limiter_is_shared(tmp_path):
+    path = str(tmp_path / "limits.json")
+    first = pythonpixels.RateLimiter(path)
+    second = pythonpixels.RateLimiter(path)
+
+    first.update("set_pixel", HEADERS)
+    assert second.reserve("set_pixel") == 0
+
+    assert first.reserve("set_pixel") > 9
+    assert set(second.get_limits()) == {"set_pixel"}
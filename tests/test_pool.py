@@ -0,0 +1,52 @@
+import threading
+
+import pythonpixels
+from pythonpixels.server import StandInServer
+
+from conftest import pixel
+
+
+def test_pool_writes_every_pixel_once():
+    with StandInServer(16, 8, limits={"set_pixel": (3, 0.5)}) as server:
+        pool = pythonpixels.ClientPool(["a", "b", "c"], base=server.url)
+        pool.submit(0, 0, 0x0000FF)
+        pool.write((x, 0, 0xFF00FF) for x in range(12))
+        pool.close()
+
+        # The first write to (0, 0) may already be sent, but the later one never overtakes it
+        assert pixel(server, 0, 0) == (255, 0, 255)
+        assert all(pixel(server, x, 0) == (255, 0, 255) for x in range(12))
+        assert sum(stats["writes"] for stats in pool.stats()) == server.counts["set_pixel"] <= 13
+        # The workers waited on their own rate limits instead of being rejected
+        for client in pool.clients:
+            assert set(client.metrics.as_dict().get("set_pixel", {"requests": {}})["requests"]) <= {"200"}
+
+
+def test_pool_concurrent_submits(server):
+    pool = pythonpixels.ClientPool(["a", "b"], base=server.url)
+    threads = [threading.Thread(target=pool.submit, args=(x, 1, 0x00FF00)) for x in range(16)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    pool.join()
+    pool.close()
+
+    assert all(pixel(server, x, 1) == (0, 255, 0) for x in range(16))
+    assert server.counts["set_pixel"] == 16
+
+
+def test_pool_raises_worker_errors(server):
+    pool = pythonpixels.ClientPool(["a"], base=server.url)
+    pool.clients[0].headers = {}
+
+    pool.submit(0, 0, 0xFFFFFF)
+    try:
+        pool.join()
+    except pythonpixels.APIException:
+        pass
+    else:
+        raise AssertionError("The rejected write was not raised")
+    finally:
+        pool.close()
+    assert pool.stats()[0]["writes"] == 0